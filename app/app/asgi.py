@@ -0,0 +1,25 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, for an ASGI server such as uvicorn:
+
+    uvicorn app.asgi:application --host 0.0.0.0 --port 8000
+
+Django 2.1 has no ASGI handler of its own, see core.asgi for how the WSGI
+application is served from the event loop.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = ASGIHandler(get_wsgi_application())
+
+if os.environ.get('DJANGO_PRELOAD') == '1':
+    from app.preload import warm_up
+    warm_up()
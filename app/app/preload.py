@@ -0,0 +1,34 @@
+"""Warm-up for servers that load the application once and then fork
+workers (e.g. ``gunicorn --preload``).
+
+Everything a first request would import or build is loaded in the parent
+process. The objects are then moved out of the garbage collector's reach
+with gc.freeze(), so collections in the workers do not write to those pages
+and they stay shared copy-on-write.
+"""
+import gc
+
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+WARM_UP_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+)
+
+
+def warm_up():
+    """Load views, URL patterns and DRF defaults, then freeze the heap"""
+    # Building the reverse dictionary imports every view module
+    get_resolver().reverse_dict
+    for setting in WARM_UP_SETTINGS:
+        getattr(api_settings, setting)
+
+    # Connections must not be shared with the forked workers
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
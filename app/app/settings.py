@@ -27,16 +27,41 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# The admin and the browsable API can be left out of production workers to
+# save start-up time and memory, only JSON is rendered then
+ADMIN_ENABLED = os.environ.get('DJANGO_ADMIN_ENABLED', '1') == '1'
+BROWSABLE_API_ENABLED = os.environ.get('DJANGO_BROWSABLE_API', '1') == '1'
+
+# Build the JSON of recipe lists and details in PostgreSQL and stream it as
+# it is, instead of going through model instances and serializers
+RECIPE_JSON_IN_DATABASE = os.environ.get('RECIPE_JSON_IN_DATABASE') == '1'
+
+# Directory shared by the web and job workers where the tag and ingredient
+# postings of users are saved and memory-mapped from, see recipe.postings.
+# The versions naming them come from the cache, which must be shared too.
+RECIPE_INDEX_ROOT = os.environ.get('RECIPE_INDEX_ROOT', '')
+
+
+# Responses smaller than this many bytes are not compressed
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Served through app.asgi, Django runs in a pool of this many threads, and
+# a thread waits for a slow client once this many bytes of its response
+# are not sent yet
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+ASGI_RESPONSE_BUFFER = int(os.environ.get('ASGI_RESPONSE_BUFFER',
+                                          4 * 1024 * 1024))
+
 
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -44,8 +69,12 @@ INSTALLED_APPS = [
     'recipe',
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,7 +114,62 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
-        'PORT': os.environ.get('DB_PORT')
+        'PORT': os.environ.get('DB_PORT'),
+        # Random reads cost little more than sequential ones on SSDs, with
+        # the default of 4 the planner picks sequential scans of the large
+        # tables for lookups of a few thousand recipes
+        'OPTIONS': {
+            'options': '-c random_page_cost=%s' % os.environ.get(
+                'DB_RANDOM_PAGE_COST', '1.1'
+            ),
+        },
+        # Writes are made atomic where they happen, in the recipe
+        # serializers and per import chunk. Wrapping every request would
+        # hold a transaction open for whole streamed exports and imports.
+        'ATOMIC_REQUESTS': False,
+    }
+}
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ScopedTokenBucketThrottle',
+    ],
+    # Bucket size and refill rate per user and endpoint
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'upload': os.environ.get('THROTTLE_UPLOAD_RATE', '30/hour'),
+    },
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+if BROWSABLE_API_ENABLED:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'rest_framework.renderers.BrowsableAPIRenderer'
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
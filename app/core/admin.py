@@ -1,12 +1,50 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 from django.utils.translation import gettext
 from core import models
+from core.tasks import delete_account
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator taking the row count of large unfiltered tables from the
+    planner statistics instead of a COUNT(*) over the whole table"""
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [query.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.threshold:
+                return int(row[0])
+
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with many rows"""
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    ordering = ('-id',)
 
 
 class UserAdmin(BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
+    # Prefix searches, served by the indexes on UPPER(email) and UPPER(name)
+    search_fields = ['^email', '^name']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (gettext('Personal Info'), {'fields': ('name',)}),
@@ -21,11 +59,55 @@ class UserAdmin(BaseUserAdmin):
                 }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """List only the users on the confirmation page, instead of
+        collecting every row that is going to be deleted with them"""
+        deleted_objects, model_count, perms_needed, protected = \
+            [str(obj) for obj in objs], {}, set(), []
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        model_count[self.opts.verbose_name_plural] = len(deleted_objects)
+
+        return deleted_objects, model_count, perms_needed, protected
+
+    def delete_model(self, request, obj):
+        """Deactivate the user and delete their data in the background"""
+        delete_account(obj)
+
+    def delete_queryset(self, request, queryset):
+        """Deactivate the users and delete their data in the background"""
+        for obj in queryset:
+            delete_account(obj)
+
+
+class TagAdmin(LargeTableAdmin):
+    list_display = ('name', 'user')
+    search_fields = ('^name',)
+
+
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ('name', 'user')
+    search_fields = ('^name',)
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = models.RecipeIngredient
+    fields = ('ingredient', 'amount', 'unit_of_measurement')
+    raw_id_fields = ('ingredient',)
+    extra = 0
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('title', 'user', 'time_minutes', 'price')
+    search_fields = ('^title',)
+    raw_id_fields = ('tags',)
+    inlines = (RecipeIngredientInline,)
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
 # admin login
 # admin@pythonapp.com
 # password1
@@ -0,0 +1,218 @@
+"""Serving the WSGI application of Django to an ASGI server.
+
+Django 2.1 has no ASGI handler, so requests are handed to the WSGI one
+from an event loop. The event loop does all the waiting on clients: the
+body of a request is read in full before Django is called, spooled to a
+temporary file when large, and the response is sent from a buffer filled
+by Django. Django and the ORM run in a bounded pool of threads, each
+request in one thread from start to finish, so its database connection
+never changes thread. A thread is only held while Django works, not while
+a slow client uploads or reads, unless a response outgrows the buffer.
+A response stops being produced when its client disconnects.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+# Bodies larger than this are spooled to disk while they are read
+SPOOL_MAX_SIZE = 2 * 1024 * 1024
+
+
+def environ(scope, body):
+    """Return the WSGI environ of an HTTP request"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    env = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI carries the raw bytes of the path decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        # Repeated headers are joined like a proxy would
+        env[name] = f'{env[name]},{value}' if name in env else value
+
+    return env
+
+
+class ResponseBuffer:
+    """Chunks of a response passed from the thread running Django to the
+    event loop sending them, holding the thread while more than
+    max_size bytes wait to be sent"""
+
+    def __init__(self, loop, max_size):
+        self.loop = loop
+        self.max_size = max_size
+        self.size = 0
+        self.closed = False
+        self.queue = asyncio.Queue()
+        self.space = threading.Condition()
+
+    def put(self, message):
+        """Queue a message for the event loop, from the Django thread.
+        Return False once the client is gone."""
+        size = len(message.get('body', b''))
+        with self.space:
+            while self.size > self.max_size and not self.closed:
+                self.space.wait()
+            if self.closed:
+                return False
+            self.size += size
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        return True
+
+    async def get(self):
+        """Return the next message, from the event loop, or None once
+        closed"""
+        return await self.queue.get()
+
+    def sent(self, message):
+        """Make room for the bytes of a message sent to the client"""
+        with self.space:
+            self.size -= len(message.get('body', b''))
+            self.space.notify()
+
+    def close(self):
+        """Stop the Django thread from waiting for room and from queueing
+        more, from the event loop"""
+        with self.space:
+            self.closed = True
+            self.space.notify()
+        self.queue.put_nowait(None)
+
+
+class ASGIHandler:
+    """ASGI application running a WSGI application in a thread pool"""
+
+    def __init__(self, application, threads=None, buffer_size=None):
+        self.application = application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi'
+        )
+        self.buffer_size = buffer_size or settings.ASGI_RESPONSE_BUFFER
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported scope type {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Return the body of a request as a file, or None when the client
+        went away first"""
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_event_loop()
+        buffer = ResponseBuffer(loop, self.buffer_size)
+        running = loop.run_in_executor(
+            self.executor, self.run, environ(scope, body), buffer
+        )
+        # Servers do not fail sends to clients that went away, they tell
+        # through receive
+        watching = asyncio.ensure_future(self.watch_disconnect(receive,
+                                                               buffer))
+        try:
+            while True:
+                message = await buffer.get()
+                if message is None:
+                    break
+                await send(message)
+                buffer.sent(message)
+                if message['type'] == 'http.response.body' and \
+                        not message.get('more_body', False):
+                    break
+        finally:
+            watching.cancel()
+            buffer.close()
+            await running
+            body.close()
+
+    async def watch_disconnect(self, receive, buffer):
+        """Close the buffer of a response when its client goes away"""
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                buffer.close()
+                return
+
+    def run(self, env, buffer):
+        """Call the WSGI application and queue its response, in a thread of
+        the pool"""
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = [(name.lower().encode('latin-1'),
+                                 value.encode('latin-1'))
+                                for name, value in headers]
+
+        try:
+            response = self.application(env, start_response)
+        except Exception:
+            buffer.put({'type': 'http.response.start', 'status': 500,
+                        'headers': [(b'content-type', b'text/plain')]})
+            buffer.put({'type': 'http.response.body',
+                        'body': b'Internal Server Error'})
+            raise
+        try:
+            # Streaming responses read the database while iterated, so
+            # they are iterated in this thread too
+            buffer.put({'type': 'http.response.start', **start})
+            for chunk in response:
+                if chunk and not buffer.put({'type': 'http.response.body',
+                                             'body': chunk,
+                                             'more_body': True}):
+                    return
+        finally:
+            # Ends the response even when a stream failed half way
+            buffer.put({'type': 'http.response.body', 'body': b''})
+            # Sends request_finished, which closes the connections of
+            # this thread
+            if hasattr(response, 'close'):
+                response.close()
@@ -0,0 +1,56 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.models import VersionConflict
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The object was changed since it was read.'
+    default_code = 'precondition_failed'
+
+
+def etag(version):
+    """Return the entity tag of an object at a version"""
+    return f'"{version}"'
+
+
+def if_match_version(request):
+    """Return the version given in the If-Match header of the request, or
+    None without a header or with If-Match: *"""
+    value = request.META.get('HTTP_IF_MATCH', '').strip()
+    if not value or value == '*':
+        return None
+
+    # Accept weak tags as well, compressed responses have weakened tags
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise PreconditionFailed('If-Match is not a version of this object.')
+
+
+class ConditionalUpdateMixin:
+    """Give versioned objects an ETag and only update them with If-Match
+    when they are still at that version"""
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method in ('GET', 'HEAD'):
+            self.headers['ETag'] = etag(instance.version)
+
+        return instance
+
+    def perform_update(self, serializer):
+        version = if_match_version(self.request)
+        if version is not None:
+            if version != serializer.instance.version:
+                raise PreconditionFailed()
+            serializer.instance.expect_version(version)
+        try:
+            super().perform_update(serializer)
+        except VersionConflict:
+            raise PreconditionFailed()
+
+        self.headers['ETag'] = etag(serializer.instance.version)
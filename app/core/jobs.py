@@ -0,0 +1,174 @@
+"""Deferred work queued in PostgreSQL.
+
+Tasks are plain functions registered with the ``task`` decorator, in the
+``tasks`` modules of the apps, and called with the keyword arguments stored
+in the job payload. Jobs are enqueued in the transaction of the caller, so
+they only become visible to the workers of ``manage.py run_workers`` once
+that transaction commits. Workers claim them with SELECT ... FOR UPDATE
+SKIP LOCKED and never wait for each other.
+"""
+import logging
+import random
+import threading
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# First retry after about RETRY_BASE seconds, doubling up to RETRY_MAX
+RETRY_BASE = 10
+RETRY_MAX = 60 * 60
+# Running jobs are given back to the queue after this long, their worker
+# is assumed dead
+STALE_AFTER = timedelta(minutes=30)
+
+# Jobs handled by the workers of this process, by task and outcome
+metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func=None, name=None):
+    """Register a function as task, under its module path by default"""
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        TASKS[func.task_name] = func
+        return func
+
+    if func is None:
+        return register
+
+    return register(func)
+
+
+def autodiscover():
+    """Import the tasks modules of all apps"""
+    autodiscover_modules('tasks')
+
+
+def enqueue(func_or_name, payload=None, delay=None, max_attempts=5):
+    """Queue a task with its keyword arguments, to run after an optional
+    delay in seconds"""
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if name not in TASKS:
+        raise UnknownTask(name)
+
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+
+    return Job.objects.create(task=name, payload=payload or {},
+                              run_at=run_at, max_attempts=max_attempts)
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before another attempt, with jitter"""
+    return random.uniform(0.5, 1) * min(RETRY_BASE * 2 ** (attempts - 1),
+                                        RETRY_MAX)
+
+
+def claim():
+    """Mark the next due job as running and return it, or None"""
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED,
+            run_at__lte=timezone.now()
+        ).order_by('run_at', 'id').first()
+        if job is None:
+            return None
+
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'started_at'])
+
+    return job
+
+
+def run(job):
+    """Run a claimed job and record its outcome"""
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        with transaction.atomic():
+            func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+            outcome = 'retried'
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            outcome = 'failed'
+        logger.warning('Job %s %s', job, outcome, exc_info=True)
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        outcome = 'done'
+
+    job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+    with _metrics_lock:
+        metrics[job.task, outcome] += 1
+
+    return job
+
+
+def run_next():
+    """Run the next due job, return False when there was none"""
+    job = claim()
+    if job is None:
+        return False
+
+    run(job)
+    return True
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Give jobs of workers that died while running them back to the
+    queue, or fail them when they used up their attempts, return how many
+    were requeued"""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING,
+                               started_at__lt=now - older_than)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now,
+        last_error='The worker running the job stopped.'
+    )
+    return stale.update(status=Job.QUEUED, run_at=now)
+
+
+def stats():
+    """Return the number of jobs per status and the age in seconds of the
+    oldest due job"""
+    counts = dict.fromkeys((status for status, _ in Job.STATUS_CHOICES), 0)
+    counts.update(
+        Job.objects.order_by().values_list('status').annotate(Count('id'))
+    )
+    oldest = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=timezone.now()
+    ).aggregate(oldest=Min('run_at'))['oldest']
+
+    return {
+        'jobs': counts,
+        'oldest_due_seconds': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0
+        ),
+    }
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Loading the URL patterns imports the views, as the first request would
+STARTUP_CODE = '''
+from app.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+
+def parse_importtime(output):
+    """Return (module, self us, cumulative us) for every line of a
+    ``python -X importtime`` report"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(self_us), int(cumulative_us)))
+
+    return modules
+
+
+class Command(BaseCommand):
+    """Django command to report what the start of a worker spends time on"""
+    help = 'Report the slowest imports when loading the WSGI application'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25,
+                            help='Number of modules to show')
+        parser.add_argument('--sort', choices=('self', 'cumulative'),
+                            default='cumulative')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            universal_newlines=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        modules = parse_importtime(result.stderr)
+        column = 1 if options['sort'] == 'self' else 2
+        modules.sort(key=lambda module: module[column], reverse=True)
+
+        total = sum(module[1] for module in modules)
+        self.stdout.write(
+            f'{len(modules)} modules imported in {total / 1000:.1f} ms'
+        )
+        self.stdout.write(f'{"self ms":>9} {"cumul ms":>9}  module')
+        for module, self_us, cumulative_us in modules[:options['limit']]:
+            self.stdout.write(
+                f'{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}'
+            )
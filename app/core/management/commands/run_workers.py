@@ -0,0 +1,119 @@
+import json
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from core import jobs
+
+# How often an idle worker gives jobs of dead workers back to the queue
+STALE_CHECK_INTERVAL = 60
+
+
+def work(stop, poll_interval, burst):
+    """Run jobs until stopped, or until the queue is empty in burst mode"""
+    last_check = 0
+    while not stop.is_set():
+        if jobs.run_next():
+            continue
+        if burst:
+            break
+        if time.monotonic() - last_check > STALE_CHECK_INTERVAL:
+            jobs.requeue_stale()
+            last_check = time.monotonic()
+        stop.wait(poll_interval)
+
+
+def work_thread(stop, poll_interval, burst):
+    """Run jobs in a thread of its own, with its own connection"""
+    try:
+        work(stop, poll_interval, burst)
+    finally:
+        connection.close()
+
+
+def work_process(threads, poll_interval, burst):
+    """Run worker threads in this process, stop them on SIGTERM or SIGINT,
+    and return the number of jobs they ran by task and outcome"""
+    stop = threading.Event()
+    handlers = {
+        signum: signal.signal(signum, lambda signum, frame: stop.set())
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    jobs.metrics.clear()
+
+    workers = [
+        threading.Thread(target=work_thread, args=(stop, poll_interval, burst),
+                         name=f'worker-{index}')
+        for index in range(1, threads)
+    ]
+    for worker in workers:
+        worker.start()
+    work(stop, poll_interval, burst)
+    for worker in workers:
+        worker.join()
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+    return dict(jobs.metrics)
+
+
+def _child(stdout, threads, poll_interval, burst):
+    for (task, outcome), count in work_process(threads, poll_interval,
+                                               burst).items():
+        stdout.write(f'{task} {outcome}: {count}')
+    stdout.flush()
+
+
+class Command(BaseCommand):
+    """Django command to run the jobs of the database queue"""
+    help = 'Run worker processes and threads taking jobs from the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Worker threads per process')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print the state of the queue and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(jobs.stats(), indent=2))
+            return
+
+        jobs.autodiscover()
+        jobs.requeue_stale()
+        args = (max(options['threads'], 1), options['poll_interval'],
+                options['burst'])
+        if options['processes'] <= 1:
+            for (task, outcome), count in work_process(*args).items():
+                self.stdout.write(f'{task} {outcome}: {count}')
+            return
+
+        # Children must not share the connection of the parent
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=_child, args=(self.stdout,) + args,
+                            name=f'jobs-{index}')
+            for index in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for child in children:
+            child.join()
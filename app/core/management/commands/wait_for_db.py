@@ -1,22 +1,56 @@
+import random
 import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until db is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default',
+                            help='Alias of the database to wait for')
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait before giving up')
+        parser.add_argument('--max-delay', type=float, default=5,
+                            help='Longest pause between two attempts')
+
+    def probe(self, alias):
+        """Open a connection to the database and run a trivial query"""
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            # Drop the broken connection so the next attempt opens a new one
+            connection.close()
+            raise
+
     def handle(self, *args, **options):
         """Handle function is what is run whenever this command is ran"""
         self.stdout.write('Waiting for DB...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        delay = 0.1
+        while True:
             try:
-                db_conn = connections['default']
+                self.probe(options['database'])
+                break
             except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]} '
+                        f'seconds'
+                    )
+                # Exponential backoff with full jitter
+                pause = min(random.uniform(0, delay), remaining)
+                self.stdout.write(
+                    f'Database unavailable, waiting {pause:.2f} seconds...'
+                )
+                time.sleep(pause)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('DB available!!'))
@@ -0,0 +1,155 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content that is compressed already, or not worth compressing
+SKIP_CONTENT_TYPES = ('image/', 'video/', 'audio/', 'font/woff',
+                      'application/zip', 'application/gzip',
+                      'application/x-gzip', 'application/octet-stream')
+
+
+class _BrotliStream:
+    """Brotli compressor with the interface of zlib compress objects"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def gzip_stream(level=6):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def brotli_stream(quality=5):
+    return _BrotliStream(quality)
+
+
+def zstd_stream(level=3):
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+# Content codings by preference, when the client accepts several equally
+CODECS = {}
+if brotli is not None:
+    CODECS['br'] = brotli_stream
+if zstandard is not None:
+    CODECS['zstd'] = zstd_stream
+CODECS['gzip'] = gzip_stream
+
+
+def compress(data, stream):
+    """Compress a whole body with a new compressor of a codec"""
+    compressor = stream()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_sequence(sequence, stream):
+    """Compress the chunks of a streaming body as they are produced"""
+    compressor = stream()
+    for chunk in sequence:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_accept_encoding(header):
+    """Return the quality values of the codings in an Accept-Encoding
+    header"""
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    return qualities
+
+
+def negotiate_encoding(header, codecs=CODECS):
+    """Return the supported coding the client prefers, or None"""
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in codecs:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best coding the client accepts.
+
+    Brotli and zstd are offered when their packages are installed, gzip
+    always. Bodies below COMPRESS_MIN_SIZE, media files and content types
+    that are compressed already are sent as they are. Streaming responses
+    are compressed chunk by chunk. Strong ETags are made weak, the encoded
+    body is not byte for byte the one they were computed for.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(SKIP_CONTENT_TYPES) or \
+                request.path.startswith(settings.MEDIA_URL):
+            return response
+
+        # The response depends on the header even when it is too small to
+        # compress, a larger one for the same URL would be compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and \
+                len(response.content) < settings.COMPRESS_MIN_SIZE:
+            return response
+
+        coding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if coding is None:
+            return response
+
+        stream = CODECS[coding]
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, stream
+            )
+            del response['Content-Length']
+        else:
+            content = compress(response.content, stream)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+
+        return response
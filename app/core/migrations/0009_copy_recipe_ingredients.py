@@ -0,0 +1,48 @@
+"""Move the quantities of recipe ingredients into RecipeIngredient.
+
+Ingredients with the same name for a user are merged into the one with the
+lowest id. When a recipe used several of them, the first one linked to the
+recipe keeps its amount and unit.
+"""
+from django.db import migrations
+
+COPY_RECIPE_INGREDIENTS = """
+INSERT INTO core_recipeingredient
+    (recipe_id, ingredient_id, amount, unit_of_measurement)
+SELECT DISTINCT ON (ri.recipe_id, c.id)
+    ri.recipe_id, c.id, i.amount, i.unit_of_measurement
+FROM core_recipe_ingredients ri
+JOIN core_ingredient i ON i.id = ri.ingredient_id
+JOIN (
+    SELECT user_id, name, MIN(id) AS id
+    FROM core_ingredient
+    GROUP BY user_id, name
+) c ON c.user_id = i.user_id AND c.name = i.name
+ORDER BY ri.recipe_id, c.id, ri.id
+"""
+
+DELETE_DUPLICATE_INGREDIENTS = """
+DELETE FROM core_ingredient i
+USING (
+    SELECT user_id, name, MIN(id) AS id
+    FROM core_ingredient
+    GROUP BY user_id, name
+) c
+WHERE c.user_id = i.user_id AND c.name = i.name AND c.id <> i.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunSQL(COPY_RECIPE_INGREDIENTS),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.RunSQL(DELETE_DUPLICATE_INGREDIENTS),
+    ]
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0009_copy_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='core.RecipeIngredient', to='core.Ingredient'),
+        ),
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='unit_of_measurement',
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'name')},
+        ),
+    ]
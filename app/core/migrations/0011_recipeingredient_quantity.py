@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+from core import units
+
+
+def normalize_quantities(apps, schema_editor):
+    """Fill quantity and canonical_unit, with one UPDATE per distinct unit"""
+    RecipeIngredient = apps.get_model('core', 'RecipeIngredient')
+    unit_names = RecipeIngredient.objects.values_list(
+        'unit_of_measurement', flat=True
+    ).distinct()
+    for unit in list(unit_names):
+        canonical_unit, factor = units.lookup(unit)
+        RecipeIngredient.objects.filter(unit_of_measurement=unit).update(
+            quantity=models.F('amount') * factor,
+            canonical_unit=canonical_unit
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_ingredient_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='canonical_unit',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='quantity',
+            field=models.FloatField(null=True),
+        ),
+        migrations.RunPython(normalize_quantities,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.1.15 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipeingredient_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Admin prefix searches filter on UPPER(column) LIKE 'TERM%'
+SEARCH_INDEXES = (
+    ('core_user_email_upper', 'core_user', 'email'),
+    ('core_user_name_upper', 'core_user', 'name'),
+    ('core_tag_name_upper', 'core_tag', 'name'),
+    ('core_ingredient_name_upper', 'core_ingredient', 'name'),
+    ('core_recipe_title_upper', 'core_recipe', 'title'),
+)
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, outside of a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_job'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} (UPPER({column}) text_pattern_ops)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS {name}'
+        )
+        for name, table, column in SEARCH_INDEXES
+    ]
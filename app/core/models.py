@@ -1,10 +1,17 @@
 import uuid
 import os
-from django.db import models
+from django.db import connections, models
+from django.db.models import F
+from django.db.models.sql import UpdateQuery
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
 
+from core import units
+
 
 def recipe_image_file_path(instance, file_name):
     """Generate file path for new recipe image."""
@@ -46,7 +53,87 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
-class Tag(models.Model):
+class VersionConflict(Exception):
+    """The stored object is not at the version an update expected"""
+
+
+class VersionedModel(models.Model):
+    """Model with a version raised on every update, so that concurrent
+    changes can be detected without locking rows"""
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    _expected_version = None
+
+    class Meta:
+        abstract = True
+
+    def expect_version(self, version):
+        """Make the next save only update the row while it is still at the
+        given version, raising VersionConflict otherwise. As with any
+        failed query, the surrounding transaction has to be rolled back."""
+        self._expected_version = version
+
+    def save(self, *args, **kwargs):
+        """Save the object, raising its version when it is updated"""
+        if not self._state.adding:
+            if self._expected_version is not None:
+                self.version = self._expected_version
+            self.version += 1
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._expected_version = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        if self._expected_version is None:
+            return self._do_version_update(base_qs, using, pk_val, values,
+                                           update_fields, forced_update)
+
+        # A single conditional UPDATE, no row is locked before it
+        updated = super()._do_update(
+            base_qs.filter(version=self._expected_version), using, pk_val,
+            values, update_fields, forced_update
+        )
+        if not updated:
+            raise VersionConflict(
+                f'{self._meta.object_name} {pk_val} is not at version '
+                f'{self._expected_version}'
+            )
+
+        return updated
+
+    def _do_version_update(self, base_qs, using, pk_val, values,
+                           update_fields, forced_update):
+        """Raise the version in the UPDATE and read it back from it, so that
+        concurrent saves of copies at the same version never write the
+        same version"""
+        if not any(field.attname == 'version' for field, _, _ in values):
+            return super()._do_update(base_qs, using, pk_val, values,
+                                      update_fields, forced_update)
+
+        values = [
+            (field, model, F('version') + 1)
+            if field.attname == 'version' else (field, model, value)
+            for field, model, value in values
+        ]
+        query = base_qs.filter(pk=pk_val).query.chain(UpdateQuery)
+        query.add_update_fields(values)
+        sql, params = query.get_compiler(using).as_sql()
+        column = connections[using].ops.quote_name(
+            self._meta.get_field('version').column
+        )
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING {column}', params)
+            row = cursor.fetchone()
+        if row is None:
+            return False
+
+        self.version = row[0]
+        return True
+
+
+class Tag(VersionedModel):
     """Recipe Tag to know what the recipe is for"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
@@ -54,29 +141,29 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [models.Index(fields=['user', 'name'])]
+
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
-    """Ingredient to be used in recipe"""
+class Ingredient(VersionedModel):
+    """Ingredient in the catalog of a user"""
     name = models.CharField(max_length=255)
-    amount = models.FloatField()
-    unit_of_measurement = models.CharField(max_length=255, null=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        unique_together = ('user', 'name')
+
     def __str__(self):
-        if self.unit_of_measurement:
-            return "{0} {1} {2}".format(self.amount, self.unit_of_measurement,
-                                        self.name)
-        else:
-            return "{0} {1}".format(self.amount, self.name)
+        return self.name
 
 
-class Recipe(models.Model):
+class Recipe(VersionedModel):
     """Recipe object"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -86,9 +173,95 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
-    ingredients = models.ManyToManyField('Ingredient')
+    ingredients = models.ManyToManyField('Ingredient',
+                                         through='RecipeIngredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Perceptual hash of the image and its bands, see recipe.images
+    image_hash = models.BigIntegerField(null=True, editable=False)
+    image_hash_bands = ArrayField(models.IntegerField(), null=True,
+                                  editable=False)
+
+    class Meta:
+        indexes = [
+            # Recipes of a user are listed newest first
+            models.Index(fields=['user', '-id']),
+            # Range filters and keyset pages of the orderings of the
+            # recipe list, see recipe.keyset
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'time_minutes', 'id']),
+            models.Index(fields=['user', 'title', 'id']),
+            GinIndex(fields=['image_hash_bands']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeIngredient(models.Model):
+    """Quantity of an ingredient used in a recipe"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        'Ingredient',
+        on_delete=models.CASCADE
+    )
+    amount = models.FloatField(null=True)
+    unit_of_measurement = models.CharField(max_length=255, null=True)
+    quantity = models.FloatField(null=True)
+    canonical_unit = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        unique_together = ('recipe', 'ingredient')
+
+    def normalize_quantity(self):
+        """Set quantity and canonical_unit from amount and unit"""
+        self.quantity, self.canonical_unit = units.normalize(
+            self.amount, self.unit_of_measurement
+        )
+
+    def save(self, *args, **kwargs):
+        self.normalize_quantity()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return " ".join(
+            str(part) for part in (self.amount, self.unit_of_measurement,
+                                   self.ingredient.name)
+            if part is not None
+        )
+
+
+class Job(models.Model):
+    """Unit of deferred work, run by the workers of run_workers"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    task = models.CharField(max_length=255)
+    payload = JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
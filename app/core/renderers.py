@@ -0,0 +1,37 @@
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer encoding with orjson when it is installed.
+
+    Produces the same compact UTF-8 output as DRF's JSONRenderer. Types
+    orjson does not know (Decimal, lazy strings, ...) are converted by DRF's
+    own encoder, and the stdlib renderer is used when orjson is missing or
+    when ASCII-only output is configured.
+    """
+    default = staticmethod(encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not api_settings.UNICODE_JSON:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if data is None:
+            return b''
+
+        option = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=self.default, option=option)
+
+        # Escape the characters that are valid JSON but not valid
+        # JavaScript, as the stdlib renderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
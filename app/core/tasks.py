@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from core import jobs
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+
+# Rows deleted per statement, and so per job, when purging an account
+PURGE_BATCH_SIZE = 5000
+
+
+def delete_account(user):
+    """Lock a user out at once and queue the removal of all their data"""
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    Token.objects.filter(user=user).delete()
+    jobs.enqueue(purge_account, {'user_id': user.pk})
+
+
+def _purge_statements():
+    """Return the statements deleting one batch of the data of a user, in
+    an order where no row is deleted before the rows referencing it"""
+    qn = connection.ops.quote_name
+    recipe = qn(Recipe._meta.db_table)
+    recipe_tags = qn(Recipe.tags.through._meta.db_table)
+    recipe_ingredient = qn(RecipeIngredient._meta.db_table)
+    tag = qn(Tag._meta.db_table)
+    ingredient = qn(Ingredient._meta.db_table)
+
+    def batch(table, where, returning='id'):
+        return (
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM {table} WHERE {where} LIMIT %(limit)s'
+            f') RETURNING {returning}'
+        )
+
+    # Recipes only link tags and ingredients of their own user, so the
+    # links go with the recipes. Matching the tags and ingredients too, with
+    # an OR, would scan the whole link tables instead of using their index.
+    return (
+        batch(recipe_ingredient,
+              f'recipe_id IN (SELECT id FROM {recipe} '
+              f'WHERE user_id = %(user_id)s)'),
+        batch(recipe_tags,
+              f'recipe_id IN (SELECT id FROM {recipe} '
+              f'WHERE user_id = %(user_id)s)'),
+        batch(recipe, 'user_id = %(user_id)s', returning='image'),
+        batch(tag, 'user_id = %(user_id)s'),
+        batch(ingredient, 'user_id = %(user_id)s'),
+    )
+
+
+@jobs.task
+def purge_account(user_id, batch_size=None):
+    """Delete one batch of the data of a deactivated user, queueing the
+    next batch until only the user is left, then delete the user.
+
+    Every job runs in its own short transaction and deletes at most
+    PURGE_BATCH_SIZE rows with a plain DELETE, so neither the locks held
+    nor the memory used grow with the size of the account.
+    """
+    # The account was reactivated meanwhile
+    if get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+        return
+
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    params = {'user_id': user_id, 'limit': batch_size}
+    with connection.cursor() as cursor:
+        for statement in _purge_statements():
+            cursor.execute(statement, params)
+            if not cursor.rowcount:
+                continue
+            if cursor.description[0].name == 'image':
+                files = [name for name, in cursor.fetchall() if name]
+                if files:
+                    jobs.enqueue(delete_files, {'names': files})
+            jobs.enqueue(purge_account, {'user_id': user_id,
+                                         'batch_size': batch_size})
+            return
+
+    # Nothing large is left, the collector only has the few rows of the
+    # user itself to handle, like its token, groups and permissions
+    get_user_model().objects.filter(pk=user_id).delete()
+
+
+@jobs.task
+def delete_files(names):
+    """Delete files of deleted recipes from the storage"""
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
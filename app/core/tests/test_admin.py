@@ -1,7 +1,14 @@
+from unittest.mock import patch
+
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
+from core.admin import ApproximateCountPaginator
+from core.models import Job, Recipe, Tag, Ingredient, RecipeIngredient
+from core.tasks import purge_account
+
 
 class AdminSiteTests(TestCase):
     def setUp(self) -> None:
@@ -43,3 +50,57 @@ class AdminSiteTests(TestCase):
         resp = self.client.get(url)
 
         self.assertEqual(resp.status_code, 200)
+
+    def test_delete_user_deactivates(self):
+        """Test deleting a user in the admin defers the purge"""
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        confirm = self.client.get(url)
+        resp = self.client.post(url, {'post': 'yes'})
+
+        self.assertContains(confirm, self.user.email)
+        self.assertEqual(resp.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(Job.objects.filter(task=purge_account.task_name))
+
+    def test_recipe_attribute_changelists(self):
+        """Test the recipe, tag and ingredient pages work with search"""
+        recipe = Recipe.objects.create(user=self.user, title='Pancakes',
+                                       time_minutes=5, price=5)
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        ingredient = Ingredient.objects.create(user=self.user, name='Flour')
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient)
+
+        for model, name in (('recipe', 'Pancakes'), ('tag', 'Breakfast'),
+                            ('ingredient', 'Flour')):
+            url = reverse(f'admin:core_{model}_changelist')
+            found = self.client.get(url, {'q': name[:3].lower()})
+            missed = self.client.get(url, {'q': name[1:]})
+
+            self.assertContains(found, name)
+            self.assertContains(found, self.user.email)
+            self.assertNotContains(missed, f'>{name}<')
+
+        resp = self.client.get(
+            reverse('admin:core_recipe_change', args=[recipe.id])
+        )
+        self.assertContains(resp, 'recipe_ingredients-0-ingredient')
+        self.assertEqual(str(tag), 'Breakfast')
+
+    def test_approximate_count(self):
+        """Test large unfiltered tables are counted from statistics"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_user')
+
+        with patch.object(ApproximateCountPaginator, 'threshold', 0), \
+                self.assertNumQueries(1):
+            count = ApproximateCountPaginator(
+                get_user_model().objects.order_by('id'), 10
+            ).count
+        filtered = ApproximateCountPaginator(
+            get_user_model().objects.filter(is_staff=True).order_by('id'), 10
+        ).count
+
+        self.assertEqual(count, 2)
+        self.assertEqual(filtered, 1)
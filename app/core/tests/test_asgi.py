@@ -0,0 +1,220 @@
+import asyncio
+import json
+import threading
+
+from django.test import TestCase, override_settings
+
+from core.asgi import ASGIHandler
+
+
+def http_scope(path='/', method='GET', headers=()):
+    """Return the scope of an HTTP request"""
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': list(headers),
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+
+
+async def call(handler, scope, chunks=(b'',), send=None, gone=None):
+    """Send a request body in chunks to an ASGI application and return
+    the messages it sent back. The client disconnects once the gone
+    event is set."""
+    chunks = list(chunks)
+    messages = []
+    gone = gone or asyncio.Event()
+
+    async def receive():
+        if not chunks:
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+        body = chunks.pop(0)
+        return {'type': 'http.request', 'body': body,
+                'more_body': bool(chunks)}
+
+    async def collect(message):
+        messages.append(message)
+        if send is not None:
+            await send(message)
+
+    await handler(scope, receive, collect)
+    return messages
+
+
+def response_body(messages):
+    return b''.join(message.get('body', b'') for message in messages
+                    if message['type'] == 'http.response.body')
+
+
+class ASGIHandlerTests(TestCase):
+    """Test serving a WSGI application from an event loop"""
+
+    def test_body_read_before_application(self):
+        """Test the application gets the whole body of a request"""
+        def echo(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [environ['wsgi.input'].read()]
+        handler = ASGIHandler(echo, threads=1)
+
+        messages = asyncio.run(call(handler, http_scope(method='POST'),
+                                    [b'slow ', b'upload']))
+
+        self.assertEqual(messages[0], {
+            'type': 'http.response.start', 'status': 200,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        self.assertEqual(response_body(messages), b'slow upload')
+
+    def test_environ(self):
+        """Test paths, query strings and headers are given as in WSGI"""
+        def environ_of(environ, start_response):
+            start_response('200 OK', [])
+            return [repr((environ['PATH_INFO'], environ['QUERY_STRING'],
+                          environ['CONTENT_TYPE'],
+                          environ['HTTP_ACCEPT'])).encode()]
+        handler = ASGIHandler(environ_of, threads=1)
+        scope = http_scope(path='/café/', headers=[
+            (b'content-type', b'application/json'),
+            (b'accept', b'text/csv'), (b'accept', b'*/*'),
+        ])
+        scope['query_string'] = b'tags=1,2'
+
+        messages = asyncio.run(call(handler, scope))
+
+        self.assertEqual(response_body(messages), repr((
+            '/café/'.encode().decode('latin-1'), 'tags=1,2',
+            'application/json', 'text/csv,*/*'
+        )).encode())
+
+    def test_streaming_response_in_one_thread(self):
+        """Test a streamed response is sent chunk by chunk, iterated in the
+        thread that ran the application"""
+        threads = []
+
+        def stream(environ, start_response):
+            threads.append(threading.get_ident())
+            start_response('200 OK', [])
+            for chunk in (b'a', b'b', b'c'):
+                threads.append(threading.get_ident())
+                yield chunk
+        handler = ASGIHandler(stream, threads=4)
+
+        messages = asyncio.run(call(handler, http_scope()))
+
+        self.assertEqual([m.get('body') for m in messages[1:]],
+                         [b'a', b'b', b'c', b''])
+        self.assertFalse(messages[-1].get('more_body', False))
+        self.assertEqual(len(set(threads)), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    def test_threads_bounded(self):
+        """Test no more requests run at once than there are threads"""
+        running, most = [0], [0]
+        lock = threading.Lock()
+
+        def slow(environ, start_response):
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            threading.Event().wait(0.05)
+            with lock:
+                running[0] -= 1
+            start_response('204 No Content', [])
+            return []
+        handler = ASGIHandler(slow, threads=2)
+
+        async def requests():
+            return await asyncio.gather(*[call(handler, http_scope())
+                                          for _ in range(6)])
+        responses = asyncio.run(requests())
+
+        self.assertEqual([r[0]['status'] for r in responses], [204] * 6)
+        self.assertEqual(most[0], 2)
+
+    def test_slow_reader_holds_no_thread(self):
+        """Test a response waiting for its client does not keep the only
+        thread from other requests"""
+        def hello(environ, start_response):
+            start_response('200 OK', [])
+            return [b'hello']
+        handler = ASGIHandler(hello, threads=1)
+
+        async def requests():
+            reading = asyncio.Event()
+
+            async def slow_client(message):
+                await reading.wait()
+            slow = asyncio.ensure_future(call(handler, http_scope(),
+                                              send=slow_client))
+            fast = await asyncio.wait_for(call(handler, http_scope()), 5)
+            reading.set()
+            return fast, await slow
+
+        fast, slow = asyncio.run(requests())
+
+        self.assertEqual(response_body(fast), b'hello')
+        self.assertEqual(response_body(slow), b'hello')
+
+    def test_client_gone(self):
+        """Test a stream stops and is closed when the client went away"""
+        closed = threading.Event()
+
+        class Endless:
+            def __iter__(self):
+                while True:
+                    yield b'x' * 1024
+
+            def close(self):
+                closed.set()
+
+        def endless(environ, start_response):
+            start_response('200 OK', [])
+            return Endless()
+        handler = ASGIHandler(endless, threads=1, buffer_size=4096)
+
+        async def request():
+            gone = asyncio.Event()
+
+            async def disconnect(message):
+                # Like servers, sends to a client that went away succeed
+                if message['type'] == 'http.response.body':
+                    gone.set()
+            return await asyncio.wait_for(
+                call(handler, http_scope(), send=disconnect, gone=gone), 5
+            )
+
+        messages = asyncio.run(request())
+
+        self.assertTrue(closed.is_set())
+        self.assertTrue(messages[-1].get('more_body'))
+
+    def test_lifespan(self):
+        """Test start up and shut down are acknowledged"""
+        handler = ASGIHandler(None, threads=1)
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ASGIApplicationTests(TestCase):
+    """Test the ASGI entry point of the project"""
+
+    def test_liveness(self):
+        """Test Django answers through the ASGI application"""
+        from app.asgi import application
+
+        messages = asyncio.run(call(application, http_scope('/health/live/')))
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual(json.loads(response_body(messages)),
+                         {'status': 'ok'})
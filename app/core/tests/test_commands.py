@@ -1,21 +1,99 @@
+import os
+import subprocess
+import sys
+from io import StringIO
 from unittest.mock import patch
+from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.management.commands.importtime import parse_importtime, \
+    STARTUP_CODE
+
+PROBE = 'core.management.commands.wait_for_db.Command.probe'
+IMPORTTIME_REPORT = '''import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     rest_framework.compat
+import time:      3000 |       3500 |   rest_framework.fields
+import time:       500 |       4000 | recipe.views
+'''
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """Test waiting for DB until it is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch(PROBE) as probe:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(probe.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for the DB to be ready."""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(PROBE) as probe:
+            probe.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(probe.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """Test that pauses grow but stay below the maximum delay"""
+        with patch(PROBE) as probe, patch('random.uniform') as uniform:
+            uniform.side_effect = lambda low, high: high
+            probe.side_effect = [OperationalError] * 8 + [None]
+            call_command('wait_for_db', max_delay=1, stdout=StringIO())
+
+        pauses = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(pauses[:4], [0.1, 0.2, 0.4, 0.8])
+        self.assertEqual(max(pauses), 1)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test that waiting gives up after the timeout"""
+        with patch(PROBE) as probe:
+            probe.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    def test_wait_for_db_probes_database(self):
+        """Test that the probe runs a query against the real database"""
+        call_command('wait_for_db', stdout=StringIO())
+
+    def test_parse_importtime(self):
+        """Test parsing the report of python -X importtime"""
+        self.assertEqual(parse_importtime(IMPORTTIME_REPORT), [
+            ('rest_framework.compat', 120, 120),
+            ('rest_framework.fields', 3000, 3500),
+            ('recipe.views', 500, 4000),
+        ])
+
+    @patch('subprocess.run')
+    def test_importtime(self, run):
+        """Test reporting the slowest imports of the application"""
+        run.return_value = subprocess.CompletedProcess(
+            args=[], returncode=0, stderr=IMPORTTIME_REPORT
+        )
+        out = StringIO()
+
+        call_command('importtime', limit=2, sort='self', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('-X', run.call_args[0][0])
+        self.assertEqual(lines[0], '3 modules imported in 3.6 ms')
+        self.assertTrue(lines[2].endswith('rest_framework.fields'))
+        self.assertEqual(len(lines), 4)
+
+    def test_startup_leaves_out_pillow(self):
+        """Test that loading the application and its URL patterns does not
+        import Pillow, only image uploads need it"""
+        result = subprocess.run(
+            [sys.executable, '-c',
+             STARTUP_CODE + 'import sys\nprint("PIL" in sys.modules)'],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+
+        self.assertEqual(result.stdout.strip(), 'False')
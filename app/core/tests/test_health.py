@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+LIVE_URL = reverse('health:live')
+READY_URL = reverse('health:ready')
+
+
+class HealthTests(TestCase):
+    def test_liveness(self):
+        """Test that the liveness endpoint answers without checks"""
+        resp = self.client.get(LIVE_URL)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), {'status': 'ok'})
+
+    def test_readiness(self):
+        """Test that the app is ready when database and cache work"""
+        resp = self.client.get(READY_URL)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()['checks'],
+                         {'database': 'ok', 'cache': 'ok'})
+
+    def test_readiness_database_down(self):
+        """Test that the app is not ready without a database"""
+        with patch.dict('core.views.HEALTH_CHECKS',
+                        {'database': lambda: False}):
+            resp = self.client.get(READY_URL)
+
+        self.assertEqual(resp.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(resp.json()['checks']['database'], 'failed')
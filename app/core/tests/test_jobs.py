@@ -0,0 +1,117 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task(name='tests.fail')
+def fail():
+    raise RuntimeError('Broken')
+
+
+class JobTests(TestCase):
+    """Test the database job queue"""
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Test a queued job is run with its payload"""
+        job = jobs.enqueue('tests.record', {'value': 3})
+
+        self.assertTrue(jobs.run_next())
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [3])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(jobs.run_next())
+
+    def test_enqueue_unknown_task(self):
+        """Test tasks have to be registered to be queued"""
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('tests.missing')
+
+    def test_delayed_job_not_due(self):
+        """Test jobs are not run before their time"""
+        jobs.enqueue(record, {'value': 1}, delay=60)
+
+        self.assertFalse(jobs.run_next())
+
+    @patch('core.jobs.retry_delay', return_value=30)
+    def test_failed_job_retried(self, retry_delay):
+        """Test failing jobs are queued again later until out of
+        attempts"""
+        job = jobs.enqueue(fail, max_attempts=2)
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run_next()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Broken', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run_next()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_backoff(self):
+        """Test retries wait exponentially longer, up to a limit"""
+        self.assertLessEqual(jobs.retry_delay(1), jobs.RETRY_BASE)
+        self.assertGreaterEqual(jobs.retry_delay(4), jobs.RETRY_BASE * 4)
+        self.assertLessEqual(jobs.retry_delay(30), jobs.RETRY_MAX)
+
+    def test_requeue_stale(self):
+        """Test jobs of dead workers are queued again or failed"""
+        long_ago = timezone.now() - timedelta(hours=1)
+        retry = Job.objects.create(task='tests.record', status=Job.RUNNING,
+                                   attempts=1, started_at=long_ago)
+        spent = Job.objects.create(task='tests.record', status=Job.RUNNING,
+                                   attempts=5, started_at=long_ago)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+
+        retry.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual(retry.status, Job.QUEUED)
+        self.assertEqual(spent.status, Job.FAILED)
+
+    def test_stats(self):
+        """Test the queue is summed up by status"""
+        jobs.enqueue(record, {'value': 1})
+        jobs.enqueue(record, {'value': 2}, delay=60)
+
+        stats = jobs.stats()
+
+        self.assertEqual(stats['jobs'][Job.QUEUED], 2)
+        self.assertEqual(stats['jobs'][Job.DONE], 0)
+
+    def test_run_workers_burst(self):
+        """Test the command runs the queued jobs and exits when done"""
+        for value in range(3):
+            jobs.enqueue(record, {'value': value})
+
+        out = StringIO()
+        call_command('run_workers', burst=True, stdout=out)
+
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertIn('tests.record done: 3', out.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
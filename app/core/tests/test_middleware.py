@@ -0,0 +1,96 @@
+import gzip
+from unittest import skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import middleware
+from core.middleware import CompressionMiddleware, negotiate_encoding
+
+BODY = b'{"title": "Pancakes", "time_minutes": 10}, ' * 100
+
+
+def get_response(content_type='application/json', body=BODY):
+    return HttpResponse(body, content_type=content_type)
+
+
+@override_settings(COMPRESS_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test compressing responses"""
+
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+
+    def process(self, response, encoding='gzip', path='/api/recipe/'):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        """Test a JSON body is gzipped for clients accepting gzip"""
+        resp = self.process(get_response())
+
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(resp['Vary'], 'Accept-Encoding')
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        self.assertEqual(gzip.decompress(resp.content), BODY)
+
+    def test_small_body_not_compressed(self):
+        """Test bodies under the threshold are sent as they are"""
+        resp = self.process(get_response(body=b'{}'))
+
+        self.assertFalse(resp.has_header('Content-Encoding'))
+        self.assertEqual(resp['Vary'], 'Accept-Encoding')
+
+    def test_images_not_compressed(self):
+        """Test images and media files are sent as they are"""
+        image = self.process(get_response('image/jpeg'))
+        media = self.process(get_response('text/plain'),
+                             path='/media/uploads/recipe/a.txt')
+
+        self.assertFalse(image.has_header('Content-Encoding'))
+        self.assertFalse(image.has_header('Vary'))
+        self.assertFalse(media.has_header('Content-Encoding'))
+
+    def test_not_accepted(self):
+        """Test nothing is compressed for clients refusing all codings"""
+        resp = self.process(get_response(), encoding='gzip;q=0, identity')
+
+        self.assertEqual(resp.content, BODY)
+
+    def test_streaming(self):
+        """Test streaming bodies are compressed chunk by chunk"""
+        response = StreamingHttpResponse(iter([BODY, BODY]),
+                                         content_type='application/json')
+
+        resp = self.process(response)
+
+        self.assertEqual(gzip.decompress(b''.join(resp.streaming_content)),
+                         BODY * 2)
+        self.assertFalse(resp.has_header('Content-Length'))
+
+    def test_etag_weakened(self):
+        """Test strong ETags become weak once the body is compressed"""
+        response = get_response()
+        response['ETag'] = '"3"'
+
+        resp = self.process(response)
+
+        self.assertEqual(resp['ETag'], 'W/"3"')
+
+    @skipIf(middleware.brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli is used when the client accepts it as well"""
+        resp = self.process(get_response(), encoding='gzip, deflate, br')
+
+        self.assertEqual(resp['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(resp.content), BODY)
+
+    def test_negotiate_quality(self):
+        """Test codings are chosen by the quality the client gives them"""
+        codecs = {'br': None, 'gzip': None}
+
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', codecs),
+                         'gzip')
+        self.assertEqual(negotiate_encoding('*', codecs), 'br')
+        self.assertIsNone(negotiate_encoding('deflate', codecs))
+        self.assertIsNone(negotiate_encoding('', codecs))
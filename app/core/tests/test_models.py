@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
@@ -53,24 +54,40 @@ class ModelTests(TestCase):
         """Test the ingredient string representation"""
         ingredient = models.Ingredient.objects.create(
             user=sample_user(),
-            name='Cucumber',
-            amount=1/2
+            name='Cucumber'
         )
 
-        ingredient2 = models.Ingredient.objects.create(
-            user=sample_user(email='python@python.com'),
-            name='Italian seasoning',
+        self.assertEqual(str(ingredient), ingredient.name)
+
+    def test_recipe_ingredient_str(self):
+        """Test the recipe ingredient string representation"""
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title="Greek salad",
+            time_minutes=5,
+            price=5.00
+        )
+        cucumber = models.RecipeIngredient.objects.create(
+            recipe=recipe,
+            ingredient=models.Ingredient.objects.create(user=user,
+                                                        name='Cucumber'),
+            amount=1/2
+        )
+        seasoning = models.RecipeIngredient.objects.create(
+            recipe=recipe,
+            ingredient=models.Ingredient.objects.create(
+                user=user,
+                name='Italian seasoning'
+            ),
             amount=1/4,
             unit_of_measurement="teaspoon"
         )
 
-        self.assertEqual(str(ingredient), "{0} {1}".format(ingredient.amount,
-                                                           ingredient.name))
-
-        self.assertEqual(str(ingredient2),
-                         "{0} {1} {2}".format(ingredient2.amount,
-                                              ingredient2.unit_of_measurement,
-                                              ingredient2.name))
+        self.assertEqual(str(cucumber), "0.5 Cucumber")
+        self.assertEqual(seasoning.canonical_unit, 'ml')
+        self.assertAlmostEqual(seasoning.quantity, 1.2322303984375)
+        self.assertEqual(str(seasoning), "0.25 teaspoon Italian seasoning")
 
     def test_recipe_str(self):
         """Test recipe string representation"""
@@ -83,6 +100,59 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(recipe), recipe.title)
 
+    def test_recipe_version_raised_on_update(self):
+        """Test that the version of a recipe is raised by every update"""
+        recipe = models.Recipe.objects.create(
+            user=sample_user(), title='Soup', time_minutes=5, price=5.00
+        )
+        self.assertEqual(recipe.version, 1)
+
+        recipe.title = 'Tomato soup'
+        recipe.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 2)
+
+    def test_recipe_expected_version_conflict(self):
+        """Test that a save expecting an old version changes nothing"""
+        recipe = models.Recipe.objects.create(
+            user=sample_user(), title='Soup', time_minutes=5, price=5.00
+        )
+        models.Recipe.objects.get(pk=recipe.pk).save()
+
+        recipe.title = 'Tomato soup'
+        recipe.expect_version(1)
+        with self.assertRaises(models.VersionConflict), \
+                transaction.atomic():
+            recipe.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Soup')
+        self.assertEqual(recipe.version, 2)
+
+    def test_recipe_stale_copies_get_versions_of_their_own(self):
+        """Test that saves of copies loaded at the same version each raise
+        the version, so a version never names two states"""
+        recipe = models.Recipe.objects.create(
+            user=sample_user(), title='Soup', time_minutes=5, price=5.00
+        )
+        first = models.Recipe.objects.get(pk=recipe.pk)
+        second = models.Recipe.objects.get(pk=recipe.pk)
+
+        first.title = 'Tomato soup'
+        first.save()
+        second.title = 'Pea soup'
+        second.save()
+
+        self.assertEqual((first.version, second.version), (2, 3))
+        first.title = 'Onion soup'
+        first.expect_version(first.version)
+        with self.assertRaises(models.VersionConflict), \
+                transaction.atomic():
+            first.save()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.title, recipe.version), ('Pea soup', 3))
+
     @patch('uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that the image is saved in the correct location"""
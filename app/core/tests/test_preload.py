@@ -0,0 +1,16 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from app.preload import warm_up
+
+
+class PreloadTests(SimpleTestCase):
+    @patch('app.preload.connections')
+    @patch('gc.freeze')
+    def test_warm_up(self, freeze, connections):
+        """Test that warming up closes connections and freezes the heap"""
+        warm_up()
+
+        connections.close_all.assert_called_once_with()
+        freeze.assert_called_once_with()
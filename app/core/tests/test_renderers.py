@@ -0,0 +1,62 @@
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOAD = [
+    OrderedDict([
+        ('id', 1),
+        ('title', 'Crème brûlée\u2028'),
+        ('price', Decimal('5.50')),
+        ('amount', 0.25),
+        ('whole', 1.0),
+        ('tags', [1, 2]),
+        ('error', gettext_lazy('This field is required.')),
+    ]),
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_render_matches_stdlib(self):
+        """Test that the output is the same as DRF's JSONRenderer"""
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD),
+                         JSONRenderer().render(PAYLOAD))
+
+    def test_render_decimal_as_number(self):
+        """Test that Decimal values are encoded like the stdlib does"""
+        content = FastJSONRenderer().render({'price': Decimal('5.50')})
+
+        self.assertEqual(content, b'{"price":5.5}')
+
+    def test_render_none(self):
+        """Test that no data renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    @patch('core.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        """Test falling back to the stdlib renderer"""
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD),
+                         JSONRenderer().render(PAYLOAD))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parse(self):
+        """Test parsing a JSON request body"""
+        stream = io.BytesIO('{"title": "Crème", "price": 5.5}'.encode())
+
+        data = FastJSONParser().parse(stream)
+
+        self.assertEqual(data, {'title': 'Crème', 'price': 5.5})
+
+    def test_parse_invalid(self):
+        """Test that invalid JSON raises a parse error"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": NaN}'))
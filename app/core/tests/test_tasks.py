@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from core import jobs
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+from core.tasks import delete_account
+
+
+class DeleteAccountTests(TestCase):
+    """Test deleting accounts in background batches"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@pythonapp.com',
+            'password1'
+        )
+        Token.objects.create(user=self.user)
+        for owner in (self.user, self.other):
+            tag = Tag.objects.create(user=owner, name='Vegan')
+            for index in range(3):
+                recipe = Recipe.objects.create(
+                    user=owner, title=f'Recipe {index}', time_minutes=5,
+                    price=5, image=f'uploads/recipe/{owner.pk}-{index}.jpg'
+                )
+                recipe.tags.add(tag)
+                ingredient = Ingredient.objects.create(
+                    user=owner, name=f'Ingredient {index}'
+                )
+                RecipeIngredient.objects.create(recipe=recipe,
+                                                ingredient=ingredient)
+
+    def run_jobs(self):
+        """Run queued jobs until the queue is empty, return how many"""
+        count = 0
+        while jobs.run_next():
+            count += 1
+
+        return count
+
+    def test_delete_account_deactivates(self):
+        """Test the user is locked out before anything is deleted"""
+        delete_account(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    @patch('core.tasks.PURGE_BATCH_SIZE', 2)
+    @patch('django.core.files.storage.FileSystemStorage.delete')
+    def test_purge_in_batches(self, delete_file):
+        """Test data is deleted in bounded batches, files afterwards"""
+        delete_account(self.user)
+
+        job_count = self.run_jobs()
+
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+        self.assertFalse(Ingredient.objects.filter(user=self.user).exists())
+        # 2 batches of recipe ingredients, tags, recipes and ingredients,
+        # 1 of tags, 2 file deletions and the final job
+        self.assertEqual(job_count, 12)
+        self.assertEqual(
+            sorted(call[0][0] for call in delete_file.call_args_list),
+            [f'uploads/recipe/{self.user.pk}-{index}.jpg'
+             for index in range(3)]
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 3)
+        self.assertEqual(RecipeIngredient.objects.count(), 3)
+
+    def test_purge_stops_when_reactivated(self):
+        """Test nothing is deleted for an account that was reactivated"""
+        delete_account(self.user)
+        self.user.is_active = True
+        self.user.save()
+
+        self.run_jobs()
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status, views
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.throttling import ScopedTokenBucketThrottle
+
+RATES = {'read': '3/min', 'write': '1/min', 'upload': None}
+
+
+class SampleView(views.APIView):
+    throttle_classes = (ScopedTokenBucketThrottle,)
+
+    def get(self, request):
+        return Response({})
+
+    def post(self, request):
+        return Response({})
+
+
+class Clock:
+    """Stand-in for time.time that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@patch.object(ScopedTokenBucketThrottle, 'THROTTLE_RATES', RATES)
+class TokenBucketThrottleTests(TestCase):
+    """Test throttling requests per user, endpoint and scope"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.factory = APIRequestFactory()
+        self.clock = Clock()
+        patcher = patch.object(ScopedTokenBucketThrottle, 'timer',
+                               self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, method='get', user=None):
+        request = getattr(self.factory, method)('/sample/')
+        force_authenticate(request, user or self.user)
+        return SampleView.as_view()(request)
+
+    def test_burst_then_throttled(self):
+        """Test a full bucket allows a burst, then requests are refused"""
+        responses = [self.request() for _ in range(4)]
+
+        self.assertEqual([resp.status_code for resp in responses[:3]],
+                         [status.HTTP_200_OK] * 3)
+        self.assertEqual(responses[3].status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(responses[3]['Retry-After'], '20')
+        self.assertEqual(responses[2]['RateLimit-Limit'], '3')
+        self.assertEqual(responses[2]['RateLimit-Remaining'], '0')
+        self.assertEqual(responses[2]['RateLimit-Reset'], '60')
+
+    def test_throttled_after_key_evicted(self):
+        """Test a bucket evicted while a request is refused still refuses
+        it"""
+        for _ in range(3):
+            self.request()
+
+        with patch.object(ScopedTokenBucketThrottle.cache, 'decr',
+                          side_effect=ValueError):
+            resp = self.request()
+
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bucket_refills(self):
+        """Test tokens come back at the rate of the scope"""
+        for _ in range(3):
+            self.request()
+
+        self.clock.now += 20
+        self.assertEqual(self.request().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.request().status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.clock.now += 600
+        resp = self.request()
+        self.assertEqual(resp['RateLimit-Remaining'], '2')
+
+    def test_scopes_and_users_separate(self):
+        """Test that reads, writes and users have their own buckets"""
+        other = get_user_model().objects.create_user('other@pythonapp.com',
+                                                     'password1')
+        self.assertEqual(self.request('post').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.request('post').status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.assertEqual(self.request().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.request('post', other).status_code,
+                         status.HTTP_200_OK)
+
+    def test_scope_without_rate_not_throttled(self):
+        """Test that scopes without a rate are not throttled"""
+        with patch.object(SampleView, 'throttle_scopes',
+                          {None: 'upload'}, create=True):
+            responses = [self.request('post') for _ in range(5)]
+
+        self.assertTrue(all(resp.status_code == status.HTTP_200_OK
+                            for resp in responses))
+        self.assertNotIn('RateLimit-Limit', responses[0])
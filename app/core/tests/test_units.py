@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase
+
+from core import units
+
+
+class UnitTests(SimpleTestCase):
+    def test_normalize_mass(self):
+        """Test that masses are converted to grams"""
+        self.assertEqual(units.normalize(2, 'kg'), (2000, units.GRAM))
+        self.assertEqual(units.normalize(1, 'Pounds'),
+                         (453.59237, units.GRAM))
+
+    def test_normalize_volume(self):
+        """Test that volumes are converted to milliliters"""
+        self.assertEqual(units.normalize(2, 'tbsp.'),
+                         (29.5735295625, units.MILLILITER))
+        self.assertEqual(units.normalize(1, 'fl  oz'),
+                         (29.5735295625, units.MILLILITER))
+
+    def test_normalize_unknown_unit(self):
+        """Test that unknown units are kept, lowercased"""
+        self.assertEqual(units.normalize(4, 'Cloves'), (4, 'cloves'))
+        self.assertEqual(units.normalize(3, None), (3, units.NO_UNIT))
+
+    def test_normalize_without_amount(self):
+        """Test normalizing an ingredient without an amount"""
+        self.assertEqual(units.normalize(None, 'cup'),
+                         (None, units.MILLILITER))
@@ -0,0 +1,96 @@
+import math
+
+from rest_framework.throttling import SimpleRateThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ScopedTokenBucketThrottle(SimpleRateThrottle):
+    """Token bucket per user, endpoint and scope.
+
+    Requests fall in the read or write scope by method, and views can give
+    actions their own scope through a ``throttle_scopes`` dict. The rate of
+    a scope in DEFAULT_THROTTLE_RATES is the size of the bucket and how fast
+    it refills: with 120/min a client can send 120 requests at once and one
+    more every half second after that.
+
+    The bucket is kept as the time in ms at which it will be full again
+    (GCRA), so a request costs a single atomic incr of a shared cache key.
+    The key is only set when the bucket was full already, where concurrent
+    requests can at worst lose a token to each other.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    # Idle buckets are full, their keys can expire
+    key_timeout = 24 * 60 * 60
+
+    def __init__(self):
+        pass
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        scope = scopes.get(getattr(view, 'action', None))
+        if scope is None:
+            scope = 'read' if request.method in SAFE_METHODS else 'write'
+
+        return scope
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        endpoint = getattr(view, 'basename', None) or type(view).__name__
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': f'{endpoint}:{ident}',
+        }
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.interval = max(self.duration * 1000 // self.num_requests, 1)
+        self.capacity = self.num_requests * self.interval
+        self.key = self.get_cache_key(request, view)
+        self.now = int(self.timer() * 1000)
+        try:
+            self.full_at = self.cache.incr(self.key, self.interval)
+        except ValueError:
+            self.full_at = None
+        if self.full_at is None or self.full_at - self.interval < self.now:
+            self.full_at = self.now + self.interval
+            self.cache.set(self.key, self.full_at, self.key_timeout)
+
+        allowed = self.full_at - self.now <= self.capacity
+        if not allowed:
+            # Refused requests do not take a token
+            try:
+                self.full_at = self.cache.decr(self.key, self.interval)
+            except ValueError:
+                # Expired or evicted since, there is no token to give back
+                self.full_at -= self.interval
+        self.set_headers(view)
+
+        return allowed
+
+    def remaining(self):
+        """Return the number of tokens left in the bucket"""
+        used = math.ceil((self.full_at - self.now) / self.interval)
+        return max(self.num_requests - used, 0)
+
+    def set_headers(self, view):
+        """Describe the bucket in RateLimit headers of the response"""
+        view.headers['RateLimit-Limit'] = str(self.num_requests)
+        view.headers['RateLimit-Remaining'] = str(self.remaining())
+        view.headers['RateLimit-Reset'] = str(
+            math.ceil(max(self.full_at - self.now, 0) / 1000)
+        )
+
+    def wait(self):
+        """Return the seconds until the next token is in the bucket"""
+        return (self.full_at + self.interval - self.capacity - self.now) \
+            / 1000
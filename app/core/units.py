@@ -0,0 +1,56 @@
+"""Registry of units of measurement and their conversion to canonical units.
+
+Masses are converted to grams and volumes to milliliters. Units that are not
+in the registry are their own canonical unit, so that quantities written the
+same way (e.g. "cloves") can still be added up.
+"""
+GRAM = 'g'
+MILLILITER = 'ml'
+NO_UNIT = ''
+
+UNITS = {}
+
+
+def register(canonical_unit, factor, *names):
+    """Register unit names, and their plurals, as factor canonical units"""
+    for name in names:
+        UNITS[name] = (canonical_unit, factor)
+        if len(name) > 2 and not name.endswith('s'):
+            UNITS[name + 's'] = (canonical_unit, factor)
+
+
+register(GRAM, 0.001, 'mg', 'milligram')
+register(GRAM, 1, 'g', 'gr', 'gram', 'gramme')
+register(GRAM, 1000, 'kg', 'kilo', 'kilogram', 'kilogramme')
+register(GRAM, 28.349523125, 'oz', 'ounce')
+register(GRAM, 453.59237, 'lb', 'lbs', 'pound')
+
+register(MILLILITER, 1, 'ml', 'milliliter', 'millilitre')
+register(MILLILITER, 10, 'cl', 'centiliter', 'centilitre')
+register(MILLILITER, 100, 'dl', 'deciliter', 'decilitre')
+register(MILLILITER, 1000, 'l', 'liter', 'litre')
+register(MILLILITER, 4.92892159375, 'tsp', 'teaspoon')
+register(MILLILITER, 14.78676478125, 'tbsp', 'tablespoon')
+register(MILLILITER, 29.5735295625, 'fl oz', 'fluid ounce')
+register(MILLILITER, 236.5882365, 'cup')
+register(MILLILITER, 473.176473, 'pint')
+register(MILLILITER, 946.352946, 'quart')
+register(MILLILITER, 3785.411784, 'gallon')
+
+
+def lookup(unit):
+    """Return the canonical unit of a unit and the factor to convert to it"""
+    if not unit:
+        return NO_UNIT, 1
+    key = ' '.join(unit.lower().replace('.', ' ').split())
+
+    return UNITS.get(key, (key, 1))
+
+
+def normalize(amount, unit):
+    """Return an amount in a unit as a quantity in its canonical unit"""
+    canonical_unit, factor = lookup(unit)
+    if amount is None:
+        return None, canonical_unit
+
+    return amount * factor, canonical_unit
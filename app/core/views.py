@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.db import connection, DatabaseError
+from django.http import JsonResponse
+
+
+def check_database():
+    """Return whether the database answers a trivial query"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+
+    return True
+
+
+def check_cache():
+    """Return whether the cache stores and returns a value"""
+    try:
+        cache.set('health:ready', 1, 5)
+        return cache.get('health:ready') == 1
+    except Exception:
+        # Cache backends raise their own client errors
+        return False
+
+
+HEALTH_CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+}
+
+
+def liveness(request):
+    """Report that the process is up and serving requests"""
+    return JsonResponse({'status': 'ok'})
+
+
+def readiness(request):
+    """Report whether the database and the cache are usable"""
+    checks = {name: check() for name, check in HEALTH_CHECKS.items()}
+    ready = all(checks.values())
+    return JsonResponse(
+        {
+            'status': 'ok' if ready else 'unavailable',
+            'checks': {name: 'ok' if passed else 'failed'
+                       for name, passed in checks.items()},
+        },
+        status=200 if ready else 503
+    )
@@ -0,0 +1,65 @@
+"""Helpers for the benchmark management commands"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+
+UNITS = ('g', 'kg', 'cup', 'tbsp', 'tsp', 'ml', None)
+
+
+@contextmanager
+def sample_library(recipes=1000, tags=20, ingredients=50, per_recipe=5):
+    """Create a throwaway user owning a library of recipes, the data is
+    rolled back when the block exits"""
+    with transaction.atomic():
+        user = get_user_model().objects.create_user(
+            f'bench-{uuid.uuid4().hex}@pythonapp.com', 'benchmark'
+        )
+        tag_objs = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(tags)
+        )
+        ingredient_objs = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}')
+            for i in range(ingredients)
+        )
+        recipe_objs = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=i % 240,
+                   price=random.randint(100, 9999) / 100,
+                   link='https://example.com/recipe')
+            for i in range(recipes)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipe_objs
+            for tag in random.sample(tag_objs, min(per_recipe, tags))
+        )
+        recipe_ingredients = [
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=random.randint(1, 500) / 4,
+                             unit_of_measurement=random.choice(UNITS))
+            for recipe in recipe_objs
+            for ingredient in random.sample(ingredient_objs,
+                                            min(per_recipe, ingredients))
+        ]
+        for recipe_ingredient in recipe_ingredients:
+            recipe_ingredient.normalize_quantity()
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+
+        yield user
+        transaction.set_rollback(True)
+
+
+def best_time(func, repeat=5):
+    """Return the fastest of several runs of func, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
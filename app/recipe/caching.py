@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Owned id sets kept in the memory of this process, least recently used
+# dropped first
+LOCAL_OWNED_IDS = 1024
+_local_owned_ids = OrderedDict()
+_local_lock = threading.Lock()
+
+# Owned id lookups by namespace and the tier that answered them
+owned_ids_lookups = Counter()
+
+
+def _version_key(namespace, user_id):
+    return f'{namespace}:version:{user_id}'
+
+
+def get_version(user_id, namespace='recipes'):
+    """Return the current version of the data of a user in a namespace"""
+    key = _version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1, so entries cached under an
+        # evicted version are never mistaken for current ones
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(user_id, namespace='recipes'):
+    """Invalidate everything cached for the data of a user in a namespace"""
+    try:
+        cache.incr(_version_key(namespace, user_id))
+    except ValueError:
+        get_version(user_id, namespace)
+
+
+def bump_version_on_commit(user_id, namespace='recipes'):
+    """Invalidate the cached data of a user once the current transaction
+    commits, so no request can cache rows that are not visible yet under
+    the new version"""
+    transaction.on_commit(lambda: bump_version(user_id, namespace))
+
+
+def versioned_key(prefix, user_id, ids, namespace='recipes'):
+    """Return a cache key for a set of ids at the current version"""
+    digest = hashlib.md5(
+        ','.join(str(pk) for pk in sorted(set(ids))).encode()
+    ).hexdigest()
+    return f'{prefix}:{user_id}:{get_version(user_id, namespace)}:{digest}'
+
+
+def owned_ids_namespace(model):
+    """Return the version namespace of the ids of a model owned by users"""
+    return f'{model._meta.model_name}-ids'
+
+
+def owned_ids(model, user_id):
+    """Return the frozenset of the ids of the rows of a model a user owns.
+
+    The set is looked up in the memory of this process, then in the shared
+    cache, then in the database, under the current version of the namespace
+    of the model, so deleting a row makes every tier miss.
+    """
+    namespace = owned_ids_namespace(model)
+    key = f'{namespace}:{user_id}:{get_version(user_id, namespace)}'
+
+    with _local_lock:
+        ids = _local_owned_ids.get(key)
+        if ids is not None:
+            _local_owned_ids.move_to_end(key)
+            owned_ids_lookups[namespace, 'local'] += 1
+            return ids
+
+    ids = cache.get(key)
+    if ids is not None:
+        tier = 'shared'
+    else:
+        tier = 'database'
+        ids = frozenset(
+            model.objects.filter(user_id=user_id).values_list('id', flat=True)
+        )
+        cache.set(key, ids, None)
+
+    with _local_lock:
+        _local_owned_ids[key] = ids
+        if len(_local_owned_ids) > LOCAL_OWNED_IDS:
+            _local_owned_ids.popitem(last=False)
+        owned_ids_lookups[namespace, tier] += 1
+
+    return ids
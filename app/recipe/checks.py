@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends keeping entries in the memory of each process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_index_cache(app_configs, **kwargs):
+    """Check the versions naming saved indexes are shared by the processes
+    sharing RECIPE_INDEX_ROOT"""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.RECIPE_INDEX_ROOT and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            'RECIPE_INDEX_ROOT is set but the default cache is local to '
+            'each process.',
+            hint='Every process would load and delete indexes at versions '
+                 'of its own. Set CACHE_BACKEND to a shared cache, such as '
+                 'django.core.cache.backends.db.DatabaseCache.',
+            id='recipe.E001',
+        )]
+
+    return []
@@ -0,0 +1,109 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from core.models import Recipe, RecipeIngredient
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link', 'tags',
+               'ingredients')
+
+
+class Echo:
+    """File-like object that hands back what is written to it, so csv.writer
+    can produce lines for a streaming response"""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _tags_for(recipe_ids):
+    """Return the tags of the given recipes grouped by recipe id"""
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag_id').values_list('recipe_id', 'tag__id', 'tag__name')
+    for recipe_id, tag_id, name in rows:
+        tags[recipe_id].append({'id': tag_id, 'name': name})
+
+    return tags
+
+
+def _ingredients_for(recipe_ids):
+    """Return the ingredients of the given recipes grouped by recipe id"""
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name', 'amount',
+        'unit_of_measurement'
+    )
+    for recipe_id, ingredient_id, name, amount, unit in rows:
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'amount': amount,
+            'unit_of_measurement': unit,
+        })
+
+    return ingredients
+
+
+def iter_recipes(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield recipe dicts with embedded tags and ingredients.
+
+    Recipes are read through a server-side cursor and their tags and
+    ingredients are fetched with one query per relation and chunk, so memory
+    use depends on chunk_size rather than on the size of the library.
+    """
+    rows = queryset.values(
+        'id', 'title', 'time_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        recipe_ids = [row['id'] for row in chunk]
+        tags = _tags_for(recipe_ids)
+        ingredients = _ingredients_for(recipe_ids)
+        for row in chunk:
+            yield {
+                'id': row['id'],
+                'title': row['title'],
+                'ingredients': ingredients[row['id']],
+                'tags': tags[row['id']],
+                'time_minutes': row['time_minutes'],
+                'price': '{:f}'.format(row['price']),
+                'link': row['link'],
+            }
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one JSON document per recipe"""
+    for recipe in iter_recipes(queryset, chunk_size):
+        yield json.dumps(recipe) + '\n'
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV lines, tags and ingredients are embedded as JSON arrays"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for recipe in iter_recipes(queryset, chunk_size):
+        recipe['tags'] = json.dumps(recipe['tags'])
+        recipe['ingredients'] = json.dumps(recipe['ingredients'])
+        yield writer.writerow([recipe[column] for column in CSV_COLUMNS])
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
@@ -0,0 +1,75 @@
+"""Perceptual hashes of recipe photos.
+
+A photo is hashed with dHash: shrunk to 9x8 grey pixels, every bit of the
+64 bit hash tells whether a pixel is brighter than its right neighbour.
+Re-encoded, resized or slightly edited copies of a photo get hashes a few
+bits apart, unrelated photos about 32 bits apart.
+
+Near duplicates are found with multi-index hashing: the hash is cut into
+HASH_BANDS bands of 16 bits, and two hashes at most HASH_BANDS - 1 bits
+apart have at least one band in common. The bands are stored in an
+indexed array column, so a lookup only compares the few photos sharing a
+band instead of every photo.
+"""
+import numpy as np
+
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+# Largest distance at which photos are still the same
+MAX_DISTANCE = HASH_BANDS - 1
+
+
+def dhash(file):
+    """Return the dHash of an image file as a signed 64 bit integer, fit
+    for a bigint column, leaving the file at its start"""
+    # Only uploads need Pillow, serving does not load it
+    from PIL import Image
+
+    file.seek(0)
+    with Image.open(file) as image:
+        pixels = np.asarray(
+            image.convert('L').resize((9, 8), Image.LANCZOS),
+            dtype=np.int16
+        )
+    file.seek(0)
+
+    brighter = pixels[:, :-1] > pixels[:, 1:]
+    return int(np.packbits(brighter).view('>i8')[0])
+
+
+def hash_bands(image_hash):
+    """Return the bands of a hash, each tagged with its position so equal
+    bits in different bands do not match"""
+    unsigned = image_hash & (2 ** 64 - 1)
+    mask = 2 ** BAND_BITS - 1
+    return [
+        band << BAND_BITS | (unsigned >> (band * BAND_BITS)) & mask
+        for band in range(HASH_BANDS)
+    ]
+
+
+def distance(hash_a, hash_b):
+    """Return the number of bits two hashes differ in"""
+    return bin((hash_a ^ hash_b) & (2 ** 64 - 1)).count('1')
+
+
+def near_duplicates(queryset, image_hash, max_distance=MAX_DISTANCE):
+    """Return the recipes of a queryset whose photo is at most max_distance
+    bits from a hash, closest first"""
+    if max_distance > MAX_DISTANCE:
+        raise ValueError(f'Bands only find photos up to {MAX_DISTANCE} '
+                         f'bits apart')
+
+    candidates = queryset.filter(
+        image_hash_bands__overlap=hash_bands(image_hash)
+    ).exclude(image='')
+    distances = {
+        recipe: distance(recipe.image_hash, image_hash)
+        for recipe in candidates
+    }
+
+    return sorted(
+        (recipe for recipe, bits in distances.items()
+         if bits <= max_distance),
+        key=lambda recipe: (distances[recipe], -recipe.pk)
+    )
@@ -0,0 +1,336 @@
+import csv
+import io
+import json
+import math
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+
+from core import units
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+from recipe.caching import bump_version_on_commit
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+STAGING_TABLES = {
+    'import_recipe': ('row_no', 'id', 'title', 'time_minutes', 'price',
+                      'link'),
+    'import_recipe_tag': ('row_no', 'name'),
+    'import_recipe_ingredient': ('row_no', 'name', 'amount',
+                                 'unit_of_measurement', 'quantity',
+                                 'canonical_unit'),
+}
+
+STAGING_DDL = """
+CREATE TEMPORARY TABLE import_recipe (
+    row_no integer PRIMARY KEY,
+    id integer,
+    title varchar(255) NOT NULL,
+    time_minutes integer NOT NULL,
+    price numeric(5, 2) NOT NULL,
+    link varchar(255) NOT NULL
+);
+CREATE TEMPORARY TABLE import_recipe_tag (
+    row_no integer NOT NULL,
+    name varchar(255) NOT NULL
+);
+CREATE TEMPORARY TABLE import_recipe_ingredient (
+    row_no integer NOT NULL,
+    name varchar(255) NOT NULL,
+    amount double precision,
+    unit_of_measurement varchar(255),
+    quantity double precision,
+    canonical_unit varchar(255) NOT NULL
+);
+"""
+
+# Columns that are never NULL, so an empty CSV field means an empty string
+NOT_NULL_COLUMNS = {
+    'import_recipe': ('title', 'link'),
+    'import_recipe_tag': ('name',),
+    'import_recipe_ingredient': ('name', 'canonical_unit'),
+}
+
+
+class ImportReport:
+    """Progress and per-row errors of a recipe import"""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        """Record an invalid row, keeping at most MAX_REPORTED_ERRORS"""
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'errors': self.errors,
+        }
+
+
+def _read_ndjson(lines):
+    """Yield (line number, record or error message) for NDJSON lines"""
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as exc:
+            yield line_no, f'Invalid JSON: {exc}'
+
+
+def _read_csv(lines):
+    """Yield (line number, record or error message) for CSV lines, the tags
+    and ingredients columns hold JSON arrays as written by the export"""
+    line_no = 0
+
+    def counted():
+        # The reader does not count the lines of rows it refuses
+        nonlocal line_no
+        for line_no, line in enumerate(lines, start=1):
+            yield line
+
+    reader = csv.DictReader(counted())
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield line_no, f'Invalid CSV: {exc}'
+            continue
+        try:
+            for column in ('tags', 'ingredients'):
+                record[column] = json.loads(record.get(column) or '[]')
+        except ValueError as exc:
+            yield line_no, f'Invalid JSON in {column}: {exc}'
+            continue
+        yield line_no, record
+
+
+def _readable(records):
+    """Yield the records of a reader, ending with an error when the rest
+    of the file cannot be decoded"""
+    line_no = 0
+    try:
+        for line_no, record in records:
+            yield line_no, record
+    except UnicodeDecodeError as exc:
+        yield line_no + 1, f'The file is not valid UTF-8: {exc.reason}'
+
+
+def _text(value, field, required=True):
+    """Validate a text value that has to fit in a varchar(255)"""
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f'{field} is required')
+    if len(value) > 255:
+        raise ValueError(f'{field} is longer than 255 characters')
+    # PostgreSQL text cannot hold NUL, nor can UTF-8 hold lone surrogates
+    if '\x00' in value:
+        raise ValueError(f'{field} contains a NUL character')
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        raise ValueError(f'{field} is not valid Unicode')
+
+    return value
+
+
+def clean_record(record):
+    """Validate a record and return the values to stage for it"""
+    if not isinstance(record, dict):
+        raise ValueError('Expected an object')
+
+    title = _text(record.get('title'), 'title')
+    link = _text(record.get('link'), 'link', required=False)
+    try:
+        time_minutes = int(record.get('time_minutes'))
+    except (TypeError, ValueError):
+        raise ValueError('time_minutes must be an integer')
+    if abs(time_minutes) >= 2 ** 31:
+        raise ValueError('time_minutes is out of range')
+    try:
+        price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError('price must be a decimal number')
+    if not price.is_finite() or abs(price) >= 1000:
+        raise ValueError('price must be below 1000')
+
+    for field in ('tags', 'ingredients'):
+        if not isinstance(record.get(field) or [], list):
+            raise ValueError(f'{field} must be a list')
+
+    tags = []
+    for tag in record.get('tags') or []:
+        name = tag.get('name') if isinstance(tag, dict) else tag
+        tags.append(_text(name, 'tag name'))
+
+    ingredients = {}
+    for ingredient in record.get('ingredients') or []:
+        if not isinstance(ingredient, dict):
+            raise ValueError('ingredients must be objects')
+        name = _text(ingredient.get('name'), 'ingredient name')
+        amount = ingredient.get('amount')
+        if amount is not None:
+            try:
+                amount = float(amount)
+            except (TypeError, ValueError):
+                raise ValueError('ingredient amount must be a number')
+            if not math.isfinite(amount):
+                raise ValueError('ingredient amount must be finite')
+        unit = _text(ingredient.get('unit_of_measurement'),
+                     'unit_of_measurement', required=False)
+        ingredients.setdefault(
+            name, (name, amount, unit or None) + units.normalize(amount, unit)
+        )
+
+    return (title, time_minutes, price, link), set(tags), \
+        list(ingredients.values())
+
+
+def _copy(cursor, table, rows):
+    """Load rows into a staging table with COPY"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    columns = ', '.join(STAGING_TABLES[table])
+    not_null = ', '.join(NOT_NULL_COLUMNS[table])
+    cursor.copy_expert(
+        f'COPY {table} ({columns}) FROM STDIN '
+        f'WITH (FORMAT csv, FORCE_NOT_NULL ({not_null}))',
+        buffer
+    )
+
+
+def _merge(cursor, user_id):
+    """Move the staged chunk into the recipe tables, set-wise"""
+    qn = connection.ops.quote_name
+    recipe_table = qn(Recipe._meta.db_table)
+    tag_table = qn(Tag._meta.db_table)
+    ingredient_table = qn(Ingredient._meta.db_table)
+    recipe_tags = qn(Recipe.tags.through._meta.db_table)
+    recipe_ingredients = qn(RecipeIngredient._meta.db_table)
+
+    cursor.execute(
+        'UPDATE import_recipe SET id = nextval(pg_get_serial_sequence(%s, '
+        '\'id\'))', [Recipe._meta.db_table]
+    )
+    cursor.execute(
+        f'INSERT INTO {recipe_table} '
+        f'(id, user_id, title, time_minutes, price, link, version) '
+        f'SELECT id, %s, title, time_minutes, price, link, 1 '
+        f'FROM import_recipe', [user_id]
+    )
+    # Tags are deduplicated by name per user, reusing existing ones
+    cursor.execute(
+        f'INSERT INTO {tag_table} (name, user_id, version) '
+        f'SELECT DISTINCT s.name, %s, 1 FROM import_recipe_tag s '
+        f'WHERE NOT EXISTS (SELECT 1 FROM {tag_table} t '
+        f'WHERE t.user_id = %s AND t.name = s.name)', [user_id, user_id]
+    )
+    cursor.execute(
+        f'INSERT INTO {recipe_tags} (recipe_id, tag_id) '
+        f'SELECT DISTINCT r.id, t.id FROM import_recipe_tag s '
+        f'JOIN import_recipe r ON r.row_no = s.row_no '
+        f'JOIN (SELECT name, MIN(id) AS id FROM {tag_table} '
+        f'WHERE user_id = %s GROUP BY name) t ON t.name = s.name', [user_id]
+    )
+    # Ingredients go into the catalog of the user, reusing existing ones
+    cursor.execute(
+        f'INSERT INTO {ingredient_table} (name, user_id, version) '
+        f'SELECT DISTINCT name, %s, 1 FROM import_recipe_ingredient '
+        f'ON CONFLICT (user_id, name) DO NOTHING', [user_id]
+    )
+    cursor.execute(
+        f'INSERT INTO {recipe_ingredients} '
+        f'(recipe_id, ingredient_id, amount, unit_of_measurement, '
+        f'quantity, canonical_unit) '
+        f'SELECT r.id, i.id, s.amount, s.unit_of_measurement, s.quantity, '
+        f's.canonical_unit '
+        f'FROM import_recipe_ingredient s '
+        f'JOIN import_recipe r ON r.row_no = s.row_no '
+        f'JOIN {ingredient_table} i ON i.user_id = %s AND i.name = s.name',
+        [user_id]
+    )
+    cursor.execute(
+        'TRUNCATE import_recipe, import_recipe_tag, import_recipe_ingredient'
+    )
+
+
+def _load_chunk(cursor, user_id, chunk, report):
+    """Validate a chunk of records and load the valid ones"""
+    recipes, tags, ingredients = [], [], []
+    for line_no, record in chunk:
+        report.processed += 1
+        if isinstance(record, str):
+            report.add_error(line_no, record)
+            continue
+        try:
+            recipe, tag_names, recipe_ingredients = clean_record(record)
+        except ValueError as exc:
+            report.add_error(line_no, str(exc))
+            continue
+        recipes.append((line_no, None) + recipe)
+        tags.extend((line_no, name) for name in tag_names)
+        ingredients.extend((line_no,) + ingredient
+                           for ingredient in recipe_ingredients)
+
+    if not recipes:
+        return
+
+    with transaction.atomic():
+        _copy(cursor, 'import_recipe', recipes)
+        _copy(cursor, 'import_recipe_tag', tags)
+        _copy(cursor, 'import_recipe_ingredient', ingredients)
+        _merge(cursor, user_id)
+        bump_version_on_commit(user_id)
+    report.imported += len(recipes)
+
+
+def import_recipes(user, lines, import_format='ndjson',
+                   chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Import a stream of NDJSON or CSV lines into the library of a user.
+
+    Records are validated in chunks, copied into temporary staging tables
+    and merged into the recipe, tag and ingredient tables with a handful of
+    set-wise statements per chunk. Tags and ingredients are matched by name
+    against the ones the user already has. Each chunk is committed on its
+    own, so a bad row only costs that row. progress is called with the
+    report after every chunk.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f'Unsupported format {import_format}')
+
+    records = _readable(_read_ndjson(lines) if import_format == 'ndjson'
+                        else _read_csv(lines))
+    report = ImportReport()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DROP TABLE IF EXISTS import_recipe, import_recipe_tag, '
+            'import_recipe_ingredient'
+        )
+        cursor.execute(STAGING_DDL)
+        try:
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                _load_chunk(cursor, user.id, chunk, report)
+                if progress:
+                    progress(report)
+        finally:
+            cursor.execute(
+                'DROP TABLE import_recipe, import_recipe_tag, '
+                'import_recipe_ingredient'
+            )
+
+    return report
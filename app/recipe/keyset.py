@@ -0,0 +1,128 @@
+"""Ordering and keyset paging of the recipe list.
+
+A page is fetched by seeking past the sort key of the last recipe of the
+previous page, (field, id) > (value, id), instead of counting an offset.
+Each ordering field has a (user_id, field, id) index, so the keys of a
+page are read from the index alone and a page costs the same at any
+depth. The recipes of the page are then fetched by id.
+"""
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+# Fields the recipe list can be ordered by, newest first by default
+ORDERING_FIELDS = ('id', 'price', 'time_minutes', 'title')
+DEFAULT_ORDERING = '-id'
+MAX_PAGE_SIZE = 1000
+
+
+def ordering(query_params):
+    """Return the field and direction asked for with the ordering
+    parameter, raising a ValidationError for fields not allowed"""
+    value = query_params.get('ordering') or DEFAULT_ORDERING
+    field = value.lstrip('-')
+    if field not in ORDERING_FIELDS or value.count('-') > 1:
+        raise ValidationError({'ordering': [
+            f'Order by one of {", ".join(ORDERING_FIELDS)}, prefixed with '
+            f'- for descending order.'
+        ]})
+
+    return field, value.startswith('-')
+
+
+def order(queryset, field, descending):
+    """Order a queryset by a field, ties broken by id the same way"""
+    sign = '-' if descending else ''
+    if field == 'id':
+        return queryset.order_by(f'{sign}id')
+    return queryset.order_by(f'{sign}{field}', f'{sign}id')
+
+
+def encode_cursor(ordering_value, key):
+    """Return an opaque cursor for the sort key of the last recipe of a
+    page"""
+    value, pk = key
+    # Prices are kept as strings, floats would lose digits
+    if not isinstance(value, (int, str)):
+        value = str(value)
+    return base64.urlsafe_b64encode(
+        json.dumps([ordering_value, [value, pk]]).encode()
+    ).decode()
+
+
+def decode_cursor(cursor, ordering_value):
+    """Return the sort key of a cursor made for the same ordering"""
+    try:
+        cursor_ordering, key = json.loads(base64.urlsafe_b64decode(
+            cursor.encode()
+        ))
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+    if cursor_ordering != ordering_value:
+        raise ValidationError({'cursor': ['The cursor is for another '
+                                          'ordering.']})
+    if not _valid_key(ordering_value.lstrip('-'), key):
+        raise ValidationError({'cursor': ['Invalid cursor.']})
+
+    return key
+
+
+def _valid_key(field, key):
+    """Return whether a key from a cursor has values of the types of the
+    field and of the id"""
+    def integer(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    if not isinstance(key, list) or len(key) != 2 or not integer(key[1]):
+        return False
+    value = key[0]
+    if field == 'price':
+        try:
+            return isinstance(value, str) and Decimal(value).is_finite()
+        except InvalidOperation:
+            return False
+    if field == 'title':
+        return isinstance(value, str)
+
+    return integer(value)
+
+
+def page_size(query_params):
+    """Return the page size asked for with the limit parameter, or None
+    for the whole list"""
+    limit = query_params.get('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValidationError({'limit': [
+            f'A number from 1 to {MAX_PAGE_SIZE} is required.'
+        ]})
+
+    return limit
+
+
+def page_keys(queryset, field, descending, limit, key=None):
+    """Return the (field, id) keys of the recipes of a page, after a key
+    from a cursor, with the one of the first recipe of the next page"""
+    if key is not None:
+        qn = connection.ops.quote_name
+        table = qn(queryset.model._meta.db_table)
+        columns = f'{table}.{qn("id")}' if field == 'id' else \
+            f'({table}.{qn(field)}, {table}.{qn("id")})'
+        values = '%s' if field == 'id' else '(%s, %s)'
+        # Row comparison, which PostgreSQL turns into an index range
+        queryset = queryset.extra(
+            where=[f'{columns} {"<" if descending else ">"} {values}'],
+            params=key[1:] if field == 'id' else key
+        )
+
+    return list(order(queryset, field, descending).values_list(
+        field, 'id'
+    ).distinct()[:limit + 1])
@@ -0,0 +1,230 @@
+import http.client
+import io
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import patch
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import numpy as np
+import uvicorn
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ASGIHandler
+from core.models import Recipe
+from core.throttling import ScopedTokenBucketThrottle
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI server handing each connection to a bounded pool of threads,
+    like the threaded workers of WSGI servers"""
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_in_thread, request, client_address)
+
+    def process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+@contextmanager
+def wsgi_server(threads):
+    """Serve the project over WSGI from a pool of threads, yield the
+    port"""
+    server = PooledWSGIServer(('127.0.0.1', 0), threads)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        thread.join()
+        server.executor.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def asgi_server(threads):
+    """Serve the project over ASGI from uvicorn, yield the port"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(
+        ASGIHandler(get_wsgi_application(), threads=threads),
+        lifespan='off', log_level='warning', access_log=False
+    ))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]})
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+SERVERS = {'wsgi': wsgi_server, 'asgi': asgi_server}
+
+
+@contextmanager
+def served_user():
+    """Create a throwaway user with a recipe and a token, committed for the
+    server threads to see, and delete them when the block exits"""
+    user = get_user_model().objects.create_user(
+        f'bench-{uuid.uuid4().hex}@pythonapp.com', 'benchmark'
+    )
+    media_root = tempfile.mkdtemp()
+    try:
+        recipe = Recipe.objects.create(user=user, title='Curry',
+                                       time_minutes=20, price=5)
+        token = Token.objects.create(user=user)
+        with override_settings(MEDIA_ROOT=media_root):
+            yield recipe, token.key
+    finally:
+        user.delete()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def sample_upload(size=256):
+    """Return the multipart body and content type of an image upload"""
+    pixels = np.random.RandomState(1).randint(0, 256, (size, size, 3))
+    image = io.BytesIO()
+    Image.fromarray(pixels.astype('uint8')).save(image, format='PNG')
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="image"; '
+        f'filename="photo.png"\r\n'
+        f'Content-Type: image/png\r\n\r\n'
+    ).encode() + image.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def slow_upload(port, path, token, body, content_type, seconds, pieces):
+    """Upload a body in pieces spread over some seconds, return the
+    status"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    connection.putrequest('POST', path)
+    connection.putheader('Authorization', f'Token {token}')
+    connection.putheader('Content-Type', content_type)
+    connection.putheader('Content-Length', str(len(body)))
+    connection.endheaders()
+    step = -(-len(body) // pieces)
+    for start in range(0, len(body), step):
+        time.sleep(seconds / pieces)
+        connection.send(body[start:start + step])
+    status = connection.getresponse().status
+    connection.close()
+
+    return status
+
+
+def timed_get(port, path, token):
+    """Return the seconds a GET took, on a new connection"""
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    connection.request('GET', path,
+                       headers={'Authorization': f'Token {token}'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    assert response.status == 200, response.status
+
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """Django command to compare WSGI and ASGI serving under slow clients"""
+    help = 'Benchmark quick requests while many slow clients upload ' \
+           'images, served over WSGI and over ASGI by as many threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--slow-clients', type=int, default=32)
+        parser.add_argument('--upload-seconds', type=float, default=2)
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        body, content_type = sample_upload()
+        self.stdout.write(
+            f'{"mode":<5} {"threads":>7} {"slow":>5} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"max ms":>8} {"uploads/s":>9}'
+        )
+        # Every request comes from one address, throttling would refuse
+        # most of them
+        with served_user() as (recipe, token), \
+                patch.object(ScopedTokenBucketThrottle, 'THROTTLE_RATES',
+                             {}):
+            upload_path = f'/api/recipe/recipes/{recipe.id}/upload-image/'
+            detail_path = f'/api/recipe/recipes/{recipe.id}/'
+            for mode, server in SERVERS.items():
+                with server(options['threads']) as port:
+                    timings, upload_rate = self.measure(
+                        options,
+                        lambda: slow_upload(port, upload_path, token, body,
+                                            content_type,
+                                            options['upload_seconds'], 10),
+                        lambda: timed_get(port, detail_path, token)
+                    )
+                timings = sorted(timings)
+                self.stdout.write(
+                    f'{mode:<5} {options["threads"]:7} '
+                    f'{options["slow_clients"]:5} '
+                    f'{statistics.median(timings) * 1000:8.1f} '
+                    f'{timings[int(len(timings) * 0.95)] * 1000:8.1f} '
+                    f'{timings[-1] * 1000:8.1f} {upload_rate:9.1f}'
+                )
+
+    def measure(self, options, upload, get):
+        """Time quick requests one after the other while the slow clients
+        keep uploading, return the timings and the uploads done per second"""
+        stop = threading.Event()
+        uploads = []
+
+        def slow_client():
+            while not stop.is_set():
+                uploads.append(upload())
+
+        clients = [threading.Thread(target=slow_client)
+                   for _ in range(options['slow_clients'])]
+        for client in clients:
+            client.start()
+        # Let the uploads take up the threads first
+        time.sleep(0.5)
+        start = time.perf_counter()
+        try:
+            timings = [get() for _ in range(options['requests'])]
+        finally:
+            stop.set()
+            for client in clients:
+                client.join()
+        assert set(uploads) == {200}, set(uploads)
+
+        return timings, len(uploads) / (time.perf_counter() - start)
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from core import middleware
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+from recipe import serializers, sql_json
+from recipe.benchmarks import sample_library, best_time
+from recipe.read_serializers import ReadSerializer
+
+LEVELS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 5, 11),
+    'zstd': (1, 3, 19),
+}
+
+
+class Command(BaseCommand):
+    """Django command to weigh compression time against saved bytes"""
+    help = 'Benchmark the response codings on recipe list payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with sample_library(recipes=options['recipes'], tags=50,
+                            ingredients=200) as user:
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            payloads = (
+                ('list', FastJSONRenderer().render(
+                    ReadSerializer(serializers.RecipeSerializer).data(
+                        queryset
+                    )
+                )),
+                ('detail', ''.join(sql_json.stream_list(
+                    queryset, sql_json.RECIPE_DETAIL_JSON
+                )).encode()),
+            )
+
+        self.stdout.write(
+            f'{"payload":<8} {"coding":<8} {"level":>5} {"bytes":>9} '
+            f'{"ratio":>6} {"ms":>8} {"MB/s":>8}'
+        )
+        for name, payload in payloads:
+            self.stdout.write(
+                f'{name:<8} {"identity":<8} {"":>5} {len(payload):9}'
+            )
+            for coding, stream in middleware.CODECS.items():
+                for level in LEVELS[coding]:
+                    compressed = middleware.compress(
+                        payload, lambda: stream(level)
+                    )
+                    seconds = best_time(
+                        lambda: middleware.compress(payload,
+                                                    lambda: stream(level)),
+                        options['repeat']
+                    )
+                    self.stdout.write(
+                        f'{name:<8} {coding:<8} {level:5} '
+                        f'{len(compressed):9} '
+                        f'{len(payload) / len(compressed):6.1f} '
+                        f'{seconds * 1000:8.2f} '
+                        f'{len(payload) / seconds / 1e6:8.1f}'
+                    )
@@ -0,0 +1,62 @@
+import io
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from recipe.benchmarks import sample_library, best_time
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare the JSON renderers and parsers"""
+    help = 'Benchmark JSON rendering and parsing of recipe payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with sample_library(recipes=options['recipes']) as user:
+            recipes = Recipe.objects.filter(user=user).order_by('-id')
+            payloads = {
+                'list': RecipeSerializer(
+                    recipes.prefetch_related('tags', 'ingredients'),
+                    many=True
+                ).data,
+                'detail': RecipeDetailSerializer(
+                    recipes.prefetch_related(
+                        'tags', 'recipe_ingredients__ingredient'
+                    ),
+                    many=True
+                ).data,
+                # Raw Decimal prices and float amounts
+                'values': list(recipes.values(
+                    'id', 'title', 'price', 'recipe_ingredients__amount'
+                )),
+            }
+
+        self.stdout.write(
+            f'{"payload":<8} {"step":<7} {"stdlib ms":>10} {"fast ms":>10} '
+            f'{"speedup":>8}'
+        )
+        for name, data in payloads.items():
+            content = JSONRenderer().render(data)
+            steps = {
+                'render': (lambda: JSONRenderer().render(data),
+                           lambda: FastJSONRenderer().render(data)),
+                'parse': (lambda: JSONParser().parse(io.BytesIO(content)),
+                          lambda: FastJSONParser().parse(
+                              io.BytesIO(content))),
+            }
+            for step, (stdlib, fast) in steps.items():
+                slow_time = best_time(stdlib, options['repeat'])
+                fast_time = best_time(fast, options['repeat'])
+                self.stdout.write(
+                    f'{name:<8} {step:<7} {slow_time * 1000:10.1f} '
+                    f'{fast_time * 1000:10.1f} '
+                    f'{slow_time / fast_time:7.1f}x'
+                )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import serializers
+from recipe.benchmarks import sample_library, best_time
+from recipe.read_serializers import ReadSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare model serializers and read serializers"""
+    help = 'Benchmark the list serializers against the read serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        cases = (
+            (serializers.TagSerializer, Tag.objects.all()),
+            (serializers.IngredientSerializer, Ingredient.objects.all()),
+            (serializers.RecipeSerializer,
+             Recipe.objects.prefetch_related('tags', 'ingredients')),
+        )
+        self.stdout.write(
+            f'{"serializer":<22} {"rows":>6} {"model us/row":>13} '
+            f'{"read us/row":>12} {"speedup":>8}'
+        )
+        with sample_library(recipes=options['recipes'], tags=500,
+                            ingredients=1000) as user:
+            for serializer_class, queryset in cases:
+                queryset = queryset.filter(user=user).order_by('-id')
+                read_serializer = ReadSerializer(serializer_class)
+                rows = queryset.count()
+                model_time = best_time(
+                    lambda: serializer_class(queryset.all(), many=True).data,
+                    options['repeat']
+                )
+                read_time = best_time(
+                    lambda: read_serializer.data(queryset.all()),
+                    options['repeat']
+                )
+                self.stdout.write(
+                    f'{serializer_class.__name__:<22} {rows:6} '
+                    f'{model_time / rows * 1e6:13.1f} '
+                    f'{read_time / rows * 1e6:12.1f} '
+                    f'{model_time / read_time:7.1f}x'
+                )
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+from recipe.benchmarks import sample_library, best_time
+from recipe.postings import RecipeIndex
+
+
+def similar_in_sql(recipe, limit=10):
+    """Return the ids of the recipes most similar to a recipe by Jaccard,
+    counted by the database with joins over the whole library"""
+    tag_ids = list(recipe.tags.values_list('id', flat=True))
+    ingredient_ids = list(recipe.ingredients.values_list('id', flat=True))
+    size = len(tag_ids) + len(ingredient_ids)
+
+    return list(Recipe.objects.filter(user_id=recipe.user_id).exclude(
+        pk=recipe.pk
+    ).annotate(
+        shared=(Count('tags', filter=Q(tags__in=tag_ids), distinct=True) +
+                Count('ingredients', filter=Q(ingredients__in=ingredient_ids),
+                      distinct=True)),
+        size=(Count('tags', distinct=True) +
+              Count('ingredients', distinct=True)),
+    ).filter(shared__gt=0).annotate(
+        score=Cast('shared', FloatField()) / (F('size') + size - F('shared'))
+    ).order_by('-score', '-id').values_list('id', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    """Django command to compare similar recipes from SQL and the index"""
+    help = 'Benchmark similar recipes counted by joins against the ' \
+           'in-memory index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', default='1000,10000',
+                            help='Comma separated library sizes')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"rows":>6} {"sql ms":>9} {"build ms":>9} {"index ms":>9} '
+            f'{"speedup":>8}'
+        )
+        for recipes in map(int, options['recipes'].split(',')):
+            with sample_library(recipes=recipes, tags=50,
+                                ingredients=200) as user:
+                recipe = Recipe.objects.filter(user=user).first()
+                index = RecipeIndex.from_database(user.pk)
+                assert [pk for pk, _ in index.similar(recipe.pk)] == \
+                    similar_in_sql(recipe)
+
+                sql_time = best_time(lambda: similar_in_sql(recipe),
+                                     options['repeat'])
+                build_time = best_time(
+                    lambda: RecipeIndex.from_database(user.pk),
+                    options['repeat']
+                )
+                index_time = best_time(lambda: index.similar(recipe.pk),
+                                       options['repeat'])
+                self.stdout.write(
+                    f'{recipes:6} {sql_time * 1000:9.1f} '
+                    f'{build_time * 1000:9.1f} {index_time * 1000:9.2f} '
+                    f'{sql_time / index_time:7.0f}x'
+                )
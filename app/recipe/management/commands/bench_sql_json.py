@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from core.models import Recipe, RecipeIngredient
+from core.renderers import FastJSONRenderer
+from recipe import serializers, sql_json
+from recipe.benchmarks import sample_library, best_time
+from recipe.read_serializers import ReadSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare serializers with JSON built by PostgreSQL"""
+    help = 'Benchmark recipe JSON from serializers against the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', default='1000,10000',
+                            help='Comma separated library sizes')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        renderer = FastJSONRenderer()
+        read_serializer = ReadSerializer(serializers.RecipeSerializer)
+        self.stdout.write(
+            f'{"shape":<8} {"rows":>6} {"orm ms":>9} {"sql ms":>9} '
+            f'{"speedup":>8}'
+        )
+        for recipes in map(int, options['recipes'].split(',')):
+            with sample_library(recipes=recipes, tags=50,
+                                ingredients=200) as user:
+                queryset = Recipe.objects.filter(user=user).order_by('-id')
+                detail_queryset = queryset.prefetch_related(
+                    'tags',
+                    Prefetch('recipe_ingredients',
+                             RecipeIngredient.objects.select_related(
+                                 'ingredient'
+                             ))
+                )
+                cases = (
+                    ('list',
+                     lambda: renderer.render(
+                         read_serializer.data(queryset.all())
+                     ),
+                     lambda: ''.join(sql_json.stream_list(queryset.all()))),
+                    ('detail',
+                     lambda: renderer.render(
+                         serializers.RecipeDetailSerializer(
+                             detail_queryset.all(), many=True
+                         ).data
+                     ),
+                     lambda: ''.join(sql_json.stream_list(
+                         queryset.all(), sql_json.RECIPE_DETAIL_JSON
+                     ))),
+                )
+                for shape, orm, sql in cases:
+                    orm_time = best_time(orm, options['repeat'])
+                    sql_time = best_time(sql, options['repeat'])
+                    self.stdout.write(
+                        f'{shape:<8} {recipes:6} {orm_time * 1000:9.1f} '
+                        f'{sql_time * 1000:9.1f} '
+                        f'{orm_time / sql_time:7.1f}x'
+                    )
@@ -0,0 +1,174 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import keyset
+
+# Querysets read with iterator() run through a server-side cursor
+DECLARE_CURSOR = re.compile(r'^DECLARE .+? CURSOR .*?FOR (SELECT .*)$',
+                            re.DOTALL)
+
+
+def api_requests(user):
+    """Return the (description, path, params, settings) of a request for
+    every query shape of the recipe API"""
+    recipe = Recipe.objects.filter(user=user).order_by('-id').first()
+    tag_ids = ','.join(str(pk) for pk in Tag.objects.filter(
+        user=user).values_list('id', flat=True)[:2])
+    ingredient_ids = ','.join(str(pk) for pk in Ingredient.objects.filter(
+        user=user).values_list('id', flat=True)[:2])
+    recipe_ids = ','.join(str(pk) for pk in Recipe.objects.filter(
+        user=user).order_by('-id').values_list('id', flat=True)[:10])
+    recipes_url = reverse('recipe:recipe-list')
+    page_key = Recipe.objects.filter(user=user).order_by(
+        'price', 'id'
+    ).values_list('price', 'id').first()
+    database_json = {'RECIPE_JSON_IN_DATABASE': True}
+
+    shapes = [
+        ('recipe list', recipes_url, {}, {}),
+        ('recipe list by tags', recipes_url, {'tags': tag_ids}, {}),
+        ('recipe list by ingredients', recipes_url,
+         {'ingredients': ingredient_ids}, {}),
+        ('recipe list by price', recipes_url,
+         {'min_price': '10', 'max_price': '12'}, {}),
+        ('recipe list by time', recipes_url, {'max_time': '5'}, {}),
+        ('recipe list with facets', recipes_url,
+         {'max_time': '5', 'facets': 'tags,ingredients'}, {}),
+        ('recipe page by price', recipes_url,
+         {'ordering': 'price', 'limit': 50, 'max_time': 30}, {}),
+        ('recipe list as database JSON', recipes_url, {}, database_json),
+        ('tag list', reverse('recipe:tag-list'), {}, {}),
+        ('ingredient list', reverse('recipe:ingredient-list'), {}, {}),
+        ('recipe export', reverse('recipe:recipe-export'), {}, {}),
+        ('recipe totals', reverse('recipe:recipe-totals'),
+         {'recipes': recipe_ids}, {}),
+        ('shopping list', reverse('recipe:shopping-list'),
+         {'recipes': recipe_ids}, {}),
+    ]
+    if page_key is not None:
+        shapes.append(('recipe next page by price', recipes_url, {
+            'ordering': 'price', 'limit': 50,
+            'cursor': keyset.encode_cursor('price', page_key)
+        }, {}))
+    if recipe is not None:
+        detail_url = reverse('recipe:recipe-detail', args=[recipe.id])
+        shapes += [
+            ('recipe detail', detail_url, {}, {}),
+            ('recipe detail as database JSON', detail_url, {},
+             database_json),
+        ]
+
+    return shapes
+
+
+def plan_scans(plan):
+    """Yield (node type, relation, index) of the scans of a plan tree"""
+    if 'Relation Name' in plan:
+        yield plan['Node Type'], plan['Relation Name'], plan.get('Index Name')
+    for child in plan.get('Plans', ()):
+        yield from plan_scans(child)
+
+
+class Command(BaseCommand):
+    """Django command to check the plans of the queries of the recipe API"""
+    help = 'EXPLAIN every query the recipe API runs for a user and fail ' \
+           'on sequential scans of large tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user, by default '
+                                           'the one with the most recipes')
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Sequential scans of tables with fewer '
+                                 'rows are fine')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print every plan in full')
+
+    def get_user(self, email):
+        users = get_user_model().objects.all()
+        if email:
+            user = users.filter(email=email).first()
+        else:
+            user = users.annotate(
+                recipes=Count('recipe')
+            ).order_by('-recipes').first()
+        if user is None:
+            raise CommandError('No such user')
+
+        return user
+
+    def table_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+            )
+            # Tables never analyzed have -1 tuples from PostgreSQL 14 on
+            return {table: max(rows, 0) for table, rows in cursor.fetchall()}
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+
+        # psycopg2 decodes the json column unless it is returned as text
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        rows = self.table_rows()
+        client = APIClient()
+        client.force_authenticate(user)
+        problems = []
+
+        for description, path, params, overrides in api_requests(user):
+            with override_settings(ALLOWED_HOSTS=['testserver'],
+                                   **overrides), \
+                    CaptureQueriesContext(connection) as queries:
+                response = client.get(path, params)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            self.stdout.write(f'{description} ({response.status_code}, '
+                              f'{len(queries)} queries)')
+
+            # Chunked reads repeat the same plan, show each scan once
+            scans = []
+            for query in queries.captured_queries:
+                sql = query['sql']
+                declared = DECLARE_CURSOR.match(sql)
+                if declared:
+                    sql = declared.group(1)
+                if not sql.startswith('SELECT'):
+                    continue
+                plan = self.explain(sql)
+                if options['verbose_plans']:
+                    self.stdout.write(json.dumps(plan, indent=2))
+                for scan in plan_scans(plan):
+                    if scan not in scans:
+                        scans.append(scan)
+
+            for node, relation, index in scans:
+                large = rows.get(relation, 0) >= options['min_rows']
+                flag = '  <- sequential scan of a large table' \
+                    if node == 'Seq Scan' and large else ''
+                self.stdout.write(f'    {node} on {relation}'
+                                  f'{f" using {index}" if index else ""}'
+                                  f'{flag}')
+                if flag:
+                    problems.append((description, relation))
+
+        if problems:
+            raise CommandError('Sequential scans of large tables in ' +
+                               ', '.join(f'{name} ({table})'
+                                         for name, table in problems))
+        self.stdout.write('Every query uses indexes on the large tables')
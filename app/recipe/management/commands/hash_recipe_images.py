@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Django command to hash the images uploaded before hashes existed"""
+    help = 'Compute the perceptual hash of recipe images without one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(
+            image_hash__isnull=True
+        ).exclude(image='').exclude(image__isnull=True).order_by('id')
+        hashed = failed = 0
+        last_id = 0
+        while True:
+            chunk = list(recipes.filter(id__gt=last_id).only(
+                'id', 'image'
+            )[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            for recipe in chunk:
+                try:
+                    with recipe.image.open('rb') as image:
+                        image_hash = images.dhash(image)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{recipe.image.name}: {error}')
+                    failed += 1
+                    continue
+                # update() leaves the version alone, this is no edit
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    image_hash=image_hash,
+                    image_hash_bands=images.hash_bands(image_hash)
+                )
+                hashed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashed {hashed} images, {failed} could not be read'
+        ))
@@ -0,0 +1,51 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import import_recipes, IMPORT_CHUNK_SIZE, \
+    IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    """Django command to bulk import a recipe library from NDJSON or CSV"""
+    help = 'Import recipes for a user from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - for stdin')
+        parser.add_argument('--user', required=True,
+                            help='Email of the user owning the recipes')
+        parser.add_argument('--format', dest='import_format',
+                            choices=IMPORT_FORMATS, default='ndjson')
+        parser.add_argument('--chunk-size', type=int,
+                            default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        if options['path'] == '-':
+            report = self._import(user, sys.stdin, options)
+        else:
+            with open(options['path'], encoding='utf-8', newline='') as f:
+                report = self._import(user, f, options)
+
+        for error in report.errors:
+            self.stderr.write(f'line {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.imported} of {report.processed} recipes'
+        ))
+
+    def _import(self, user, lines, options):
+        """Run the import, writing progress after every chunk"""
+        def progress(report):
+            self.stdout.write(
+                f'{report.processed} processed, {report.imported} imported, '
+                f'{len(report.errors)} errors'
+            )
+
+        return import_recipes(user, lines, options['import_format'],
+                              chunk_size=options['chunk_size'],
+                              progress=progress)
@@ -0,0 +1,244 @@
+"""Tag and ingredient postings of the recipes of a user.
+
+The tags and ingredients of the recipes of a user form a sparse recipe x
+feature matrix, kept as NumPy arrays both by recipe (CSR) and by feature
+(CSC, the postings). Tags are the even features and ingredients the odd
+ones. It answers which recipes have some tags and ingredients, and how
+similar recipes are, with array operations instead of joins.
+
+With RECIPE_INDEX_ROOT set, the arrays are written as .npy files by the
+build_recipe_index job, in a directory per user and version of their
+recipes. A new version is written aside and renamed into place, so
+readers never see half an index. Every process memory-maps the files of
+the current version, sharing one copy in the page cache. Without the
+setting, or until the job ran, indexes are built in the memory of the
+process that needs them.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from core import jobs
+from core.models import Recipe, RecipeIngredient
+from recipe.caching import get_version
+
+ARRAYS = ('recipe_ids', 'row_indptr', 'row_features', 'features',
+          'feature_indptr', 'feature_rows')
+
+# Indexes kept open, least recently used dropped first
+LOCAL_INDEXES = 32
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _compressed(major, minor, size):
+    """Return the indptr and indices of a sparse matrix of ones, grouped
+    by the major axis"""
+    order = np.lexsort((minor, major))
+    indptr = np.zeros(size + 1, dtype=np.int32)
+    np.cumsum(np.bincount(major, minlength=size), out=indptr[1:])
+    return indptr, minor[order].astype(np.int32)
+
+
+class RecipeIndex:
+    """Sparse matrix of the recipes of a user and their features"""
+
+    def __init__(self, **arrays):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.sizes = np.diff(self.row_indptr)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build the matrix from an array of (recipe id, feature) rows"""
+        recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        features, columns = np.unique(pairs[:, 1], return_inverse=True)
+        row_indptr, row_features = _compressed(rows, columns,
+                                               len(recipe_ids))
+        feature_indptr, feature_rows = _compressed(columns, rows,
+                                                   len(features))
+        return cls(recipe_ids=recipe_ids.astype(np.int32),
+                   row_indptr=row_indptr, row_features=row_features,
+                   features=features.astype(np.int32),
+                   feature_indptr=feature_indptr, feature_rows=feature_rows)
+
+    @classmethod
+    def from_database(cls, user_id):
+        """Load the tags and ingredients of the recipes of a user"""
+        tags = Recipe.tags.through.objects.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe_id', 'tag_id')
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe_id', 'ingredient_id')
+
+        def as_pairs(rows, parity):
+            pairs = np.array(list(rows), dtype=np.int64).reshape(-1, 2)
+            pairs[:, 1] = pairs[:, 1] * 2 + parity
+            return pairs
+
+        return cls.from_pairs(np.concatenate((as_pairs(tags, 0),
+                                              as_pairs(ingredients, 1))))
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index saved in a directory"""
+        return cls(**{
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in ARRAYS
+        })
+
+    def save(self, path):
+        """Write the arrays of the index into a new directory, which only
+        appears once complete"""
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        building = tempfile.mkdtemp(dir=parent, prefix='.building-')
+        try:
+            for name in ARRAYS:
+                np.save(os.path.join(building, f'{name}.npy'),
+                        getattr(self, name))
+            os.rename(building, path)
+        except OSError:
+            shutil.rmtree(building, ignore_errors=True)
+            # Another job saved the same version first
+            if not os.path.isdir(path):
+                raise
+
+    def _columns(self, features):
+        """Return the columns of the features the index has"""
+        features = np.asarray(features, dtype=np.int64)
+        columns = np.searchsorted(self.features, features)
+        columns = columns[columns < len(self.features)]
+        return columns[np.isin(self.features[columns], features)]
+
+    def _rows(self, column):
+        return self.feature_rows[
+            self.feature_indptr[column]:self.feature_indptr[column + 1]
+        ]
+
+    def recipes_with(self, tag_ids=None, ingredient_ids=None):
+        """Return the sorted ids of the recipes with any of the tags, and
+        with any of the ingredients, of those given"""
+        found = np.ones(len(self.recipe_ids), dtype=bool)
+        for ids, parity in ((tag_ids, 0), (ingredient_ids, 1)):
+            if ids is None:
+                continue
+            matches = np.zeros(len(self.recipe_ids), dtype=bool)
+            for column in self._columns([pk * 2 + parity for pk in ids]):
+                matches[self._rows(column)] = True
+            found &= matches
+
+        return self.recipe_ids[found]
+
+    def similar(self, recipe_id, limit=10, metric='jaccard'):
+        """Return the (recipe id, score) of the recipes most similar to a
+        recipe, best first, ties going to the newest"""
+        row = np.searchsorted(self.recipe_ids, recipe_id)
+        if row == len(self.recipe_ids) or self.recipe_ids[row] != recipe_id:
+            return []
+
+        features = self.row_features[
+            self.row_indptr[row]:self.row_indptr[row + 1]
+        ]
+        postings = np.concatenate([self._rows(column) for column in features])
+        shared = np.bincount(postings, minlength=len(self.recipe_ids))
+        shared[row] = 0
+        candidates = np.flatnonzero(shared)
+
+        shared = shared[candidates]
+        sizes = self.sizes[candidates]
+        if metric == 'cosine':
+            scores = shared / np.sqrt(sizes * self.sizes[row])
+        else:
+            scores = shared / (sizes + self.sizes[row] - shared)
+
+        if len(candidates) > limit:
+            # Only sort the best scores, with every tie of the last one
+            lowest = -np.partition(-scores, limit - 1)[limit - 1]
+            best = scores >= lowest
+            candidates, scores = candidates[best], scores[best]
+        ids = self.recipe_ids[candidates].astype(np.int64)
+        order = np.lexsort((-ids, -scores))[:limit]
+
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+def index_path(user_id, version):
+    """Return the directory of the index of a user at a version"""
+    return os.path.join(settings.RECIPE_INDEX_ROOT, str(user_id),
+                        str(version))
+
+
+def build(user_id, version):
+    """Save the index of a user under a version, and remove the indexes of
+    older versions. Processes still reading those keep their mapping."""
+    path = index_path(user_id, version)
+    if not os.path.isdir(path):
+        RecipeIndex.from_database(user_id).save(path)
+
+    user_root = os.path.dirname(path)
+    for name in os.listdir(user_root):
+        if name.isdigit() and int(name) < version:
+            shutil.rmtree(os.path.join(user_root, name), ignore_errors=True)
+
+
+def _schedule_build(user_id, version):
+    """Queue a build of the index of a user, once per version"""
+    # The tasks module imports this one
+    from recipe.tasks import build_recipe_index
+
+    if cache.add(f'recipe-index:build:{user_id}:{version}', 1, 600):
+        jobs.enqueue(build_recipe_index, {'user_id': user_id,
+                                          'version': version})
+
+
+def _remember(user_id, version, index, final):
+    with _indexes_lock:
+        _indexes[user_id] = (version, index, final)
+        _indexes.move_to_end(user_id)
+        if len(_indexes) > LOCAL_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def get_index(user_id, build_missing=False):
+    """Return the index of a user at the current version of their recipes.
+
+    A saved index is memory-mapped. Otherwise its build is queued, and
+    until it is done an index is built in memory when build_missing is
+    set, or None is returned.
+    """
+    version = get_version(user_id)
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] != version:
+            cached = None
+        elif cached is not None:
+            _indexes.move_to_end(user_id)
+    if cached is not None and cached[2]:
+        return cached[1]
+
+    if settings.RECIPE_INDEX_ROOT:
+        path = index_path(user_id, version)
+        if os.path.isdir(path):
+            index = RecipeIndex.load(path)
+            _remember(user_id, version, index, final=True)
+            return index
+        _schedule_build(user_id, version)
+
+    # Built in memory earlier, the saved index is not there yet
+    if cached is not None:
+        return cached[1]
+    if not build_missing:
+        return None
+
+    index = RecipeIndex.from_database(user_id)
+    _remember(user_id, version, index,
+              final=not settings.RECIPE_INDEX_ROOT)
+    return index
@@ -0,0 +1,81 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import IntegerField, OuterRef, Subquery
+from rest_framework import fields, relations
+
+# Fields whose to_representation does not change values read from the
+# database, so rows can be passed through as they are
+PASSTHROUGH_FIELDS = (fields.CharField, fields.IntegerField,
+                      fields.FloatField, fields.BooleanField,
+                      fields.ReadOnlyField, relations.PrimaryKeyRelatedField)
+
+
+class SubqueryArray(Subquery):
+    """Collect the values of a single column subquery into an array"""
+    template = 'ARRAY(%(subquery)s)'
+    output_field = ArrayField(IntegerField())
+
+
+class ReadSerializer:
+    """Read-only counterpart of a ModelSerializer for hot list endpoints.
+
+    The fields of the serializer class are resolved once per process. Rows
+    are then read with values_list() and turned into dicts directly, without
+    model instances or per-field method calls, and many-to-many primary key
+    fields come from arrays of related ids built by the database. The output
+    is the same as the one of the serializer class.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    def _compile(self):
+        """Resolve the fields of the serializer into lookups"""
+        model = self.serializer_class.Meta.model
+        names, lookups, converters, annotations = [], [], [], {}
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            names.append(name)
+            if isinstance(field, relations.ManyRelatedField):
+                m2m = model._meta.get_field(field.source)
+                through = m2m.remote_field.through
+                target = through._meta.get_field(m2m.m2m_reverse_field_name())
+                annotations[f'{name}_ids'] = SubqueryArray(
+                    through.objects.filter(**{
+                        m2m.m2m_field_name(): OuterRef('pk')
+                    }).order_by('pk').values(target.attname)
+                )
+                lookups.append(f'{name}_ids')
+                continue
+            if field.source == '*':
+                raise ValueError(f'Field {name} cannot be read from a row')
+
+            lookups.append(field.source.replace('.', '__'))
+            if not isinstance(field, PASSTHROUGH_FIELDS):
+                converters.append((len(names) - 1, field.to_representation))
+
+        return names, lookups, converters, annotations
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+    def data(self, queryset):
+        """Return the serialized representation of the queryset"""
+        names, lookups, converters, annotations = self.compiled
+        rows = queryset.annotate(**annotations).values_list(*lookups)
+        if not converters:
+            return [dict(zip(names, row)) for row in rows]
+
+        result = []
+        for row in rows:
+            row = list(row)
+            for index, convert in converters:
+                if row[index] is not None:
+                    row[index] = convert(row[index])
+            result.append(dict(zip(names, row)))
+
+        return result
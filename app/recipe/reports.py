@@ -0,0 +1,126 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Sum, Count
+
+from core.models import Recipe, RecipeIngredient
+from recipe.caching import versioned_key
+
+SHOPPING_LIST_TIMEOUT = 60 * 60
+
+# Facets of the recipe list, by the link table and the field it links to
+FACETS = {
+    'tags': (Recipe.tags.through, 'tag'),
+    'ingredients': (RecipeIngredient, 'ingredient'),
+}
+
+
+def _price(value):
+    """Format a price the way the recipe serializers do"""
+    return '{:f}'.format(value.quantize(Decimal('0.01')))
+
+
+def recipe_totals(queryset):
+    """Return the price and the ingredient quantities per canonical unit of
+    every recipe in the queryset and of all of them together.
+
+    Quantities are summed by the database in one grouped query, so the cost
+    does not depend on the number of ingredients in the recipes.
+    """
+    recipes = list(queryset.values_list('id', 'price').distinct())
+    quantities = defaultdict(dict)
+    rows = RecipeIngredient.objects.filter(
+        recipe__in=queryset.order_by().values('id'),
+        quantity__isnull=False
+    ).order_by().values('recipe_id', 'canonical_unit').annotate(
+        total=Sum('quantity')
+    ).values_list('recipe_id', 'canonical_unit', 'total')
+    for recipe_id, canonical_unit, total in rows:
+        quantities[recipe_id][canonical_unit] = total
+
+    total_quantities = defaultdict(float)
+    for recipe_quantities in quantities.values():
+        for canonical_unit, total in recipe_quantities.items():
+            total_quantities[canonical_unit] += total
+
+    return {
+        'recipes': [
+            {
+                'id': recipe_id,
+                'price': _price(price),
+                'quantities': quantities[recipe_id],
+            }
+            for recipe_id, price in recipes
+        ],
+        'total': {
+            'price': _price(sum((price for _, price in recipes),
+                                Decimal(0))),
+            'quantities': dict(total_quantities),
+        },
+    }
+
+
+def shopping_list(user, recipe_ids):
+    """Return the ingredients of the recipes of a user, merged by name and
+    unit with their summed quantities.
+
+    The list comes from one grouped query over the recipe ingredients and is
+    cached until any recipe of the user changes.
+    """
+    key = versioned_key('shopping-list', user.id, recipe_ids)
+    items = cache.get(key)
+    if items is not None:
+        return items
+
+    rows = RecipeIngredient.objects.filter(
+        recipe__user=user,
+        recipe_id__in=recipe_ids
+    ).values(
+        'ingredient_id', 'ingredient__name', 'canonical_unit'
+    ).annotate(
+        total=Sum('quantity'),
+        recipes=Count('recipe_id')
+    ).order_by('ingredient__name', 'canonical_unit')
+    items = [
+        {
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'quantity': row['total'],
+            'unit': row['canonical_unit'],
+            'recipes': row['recipes'],
+        }
+        for row in rows
+    ]
+    cache.set(key, items, SHOPPING_LIST_TIMEOUT)
+
+    return items
+
+
+def facet_counts(queryset, facets):
+    """Return for each facet the tags or ingredients of the recipes in the
+    queryset, with the number of those recipes they are in, most common
+    first.
+
+    Each facet is counted by the database in one grouped query over its
+    link table, whatever the number of tags or ingredients.
+    """
+    recipes = queryset.order_by().values('id')
+    counts = {}
+    for facet in facets:
+        model, field = FACETS[facet]
+        rows = model.objects.filter(recipe__in=recipes).values(
+            f'{field}_id', f'{field}__name'
+        ).annotate(
+            recipes=Count('recipe_id')
+        ).order_by('-recipes', f'{field}__name')
+        counts[facet] = [
+            {
+                'id': row[f'{field}_id'],
+                'name': row[f'{field}__name'],
+                'count': row['recipes'],
+            }
+            for row in rows
+        ]
+
+    return counts
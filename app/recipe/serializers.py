@@ -1,5 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+from recipe import images
+from recipe.caching import owned_ids
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -15,17 +18,91 @@ class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredient objects"""
     class Meta:
         model = Ingredient
-        fields = ('id', 'name', 'amount', 'unit_of_measurement')
+        fields = ('id', 'name')
         read_only_fields = ('id',)
 
+    def validate_name(self, value):
+        """Check the user does not have an ingredient with this name yet"""
+        user = self.context['request'].user
+        if Ingredient.objects.filter(user=user, name=value).exists():
+            raise serializers.ValidationError(
+                'An ingredient with this name already exists.'
+            )
+
+        return value
+
+
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    """Serializer for the ingredients of a recipe with their quantity"""
+    id = serializers.ReadOnlyField(source='ingredient_id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'name', 'amount', 'unit_of_measurement')
+
+
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Id of a row owned by the user of the request, validated into the id.
+
+    Ids are checked against the cached set of the ids the user owns, so
+    the usual write runs no query for them. Ids missing from the set are
+    looked up, they may have been created since it was cached.
+    """
+
+    def to_internal_value(self, data):
+        request = self.context.get('request')
+        if request is None:
+            return super().to_internal_value(data).pk
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        queryset = self.get_queryset()
+        if pk not in owned_ids(queryset.model, request.user.pk) and \
+                not queryset.filter(user=request.user, pk=pk).exists():
+            self.fail('does_not_exist', pk_value=data)
+
+        return pk
+
+
+class RecipeIngredientWriteSerializer(serializers.Serializer):
+    """Validate an ingredient of a recipe given with its quantity"""
+    id = OwnedPrimaryKeyRelatedField(
+        queryset=Ingredient.objects.all(),
+        source='ingredient_id'
+    )
+    amount = serializers.FloatField(required=False, allow_null=True)
+    unit_of_measurement = serializers.CharField(max_length=255,
+                                                required=False,
+                                                allow_null=True)
+
+
+class RecipeIngredientField(OwnedPrimaryKeyRelatedField):
+    """Ingredient of a recipe, written either as an ingredient id or as an
+    object with the id, amount and unit_of_measurement"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            serializer = RecipeIngredientWriteSerializer(data=data,
+                                                         context=self.context)
+            serializer.is_valid(raise_exception=True)
+            return dict(serializer.validated_data)
+
+        return {'ingredient_id': super().to_internal_value(data)}
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for Recipe Objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = RecipeIngredientField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = OwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -36,10 +113,93 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'price', 'link')
         read_only_fields = ('id',)
 
+    def _set_tags(self, recipe, tags, created=False):
+        """Replace the tags of a recipe with at most one DELETE and one
+        INSERT, leaving the tags it keeps untouched"""
+        through = Recipe.tags.through
+        current = set() if created else set(
+            through.objects.filter(recipe=recipe).values_list('tag_id',
+                                                              flat=True)
+        )
+        wanted = dict.fromkeys(tags)
+        removed = current.difference(wanted)
+        if removed:
+            through.objects.filter(
+                recipe=recipe, tag_id__in=removed
+            )._raw_delete(through.objects.db)
+        through.objects.bulk_create(
+            through(recipe=recipe, tag_id=pk)
+            for pk in wanted if pk not in current
+        )
+
+    def _set_ingredients(self, recipe, ingredients, created=False):
+        """Replace the ingredients of a recipe and their quantities with at
+        most one DELETE and one INSERT, leaving unchanged rows untouched"""
+        current = {} if created else {
+            row[0]: row[1:]
+            for row in recipe.recipe_ingredients.values_list(
+                'ingredient_id', 'amount', 'unit_of_measurement'
+            )
+        }
+        wanted = {item['ingredient_id']: item for item in ingredients}
+        stale = [
+            pk for pk, quantity in current.items()
+            if pk not in wanted or quantity != (
+                wanted[pk].get('amount'),
+                wanted[pk].get('unit_of_measurement')
+            )
+        ]
+        if stale:
+            # Skip the delete receivers, which would look up the recipe of
+            # every row, saving the recipe already invalidates its owner.
+            # Rows are not referenced elsewhere, nothing has to cascade.
+            recipe.recipe_ingredients.filter(
+                ingredient_id__in=stale
+            )._raw_delete(RecipeIngredient.objects.db)
+        recipe_ingredients = [
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=pk,
+                amount=item.get('amount'),
+                unit_of_measurement=item.get('unit_of_measurement'),
+            )
+            for pk, item in wanted.items()
+            if pk not in current or pk in stale
+        ]
+        for recipe_ingredient in recipe_ingredients:
+            recipe_ingredient.normalize_quantity()
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create a recipe with its tags and ingredients in one transaction"""
+        tags = validated_data.pop('tags', [])
+        ingredients = validated_data.pop('ingredients', [])
+        recipe = Recipe.objects.create(**validated_data)
+        self._set_tags(recipe, tags, created=True)
+        self._set_ingredients(recipe, ingredients, created=True)
+
+        return recipe
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Update a recipe in one transaction, replacing tags and ingredients
+        when given"""
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        recipe = super().update(instance, validated_data)
+        if tags is not None:
+            self._set_tags(recipe, tags)
+        if ingredients is not None:
+            self._set_ingredients(recipe, ingredients)
+
+        return recipe
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
-    ingredients = IngredientSerializer(many=True, read_only=True)
+    ingredients = RecipeIngredientSerializer(source='recipe_ingredients',
+                                             many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
 
@@ -49,3 +209,26 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+    def update(self, instance, validated_data):
+        """Hash the uploaded image, and point the recipe to the stored file
+        of a near duplicate of the user instead of storing another copy"""
+        if 'image' not in validated_data:
+            return super().update(instance, validated_data)
+
+        image = validated_data['image']
+        if image:
+            image_hash = images.dhash(image)
+            duplicates = images.near_duplicates(
+                Recipe.objects.filter(user_id=instance.user_id), image_hash
+            )
+            if duplicates:
+                validated_data['image'] = duplicates[0].image.name
+            instance.image_hash = image_hash
+            instance.image_hash_bands = images.hash_bands(image_hash)
+        else:
+            # The image is removed, so is its hash
+            instance.image_hash = None
+            instance.image_hash_bands = None
+
+        return super().update(instance, validated_data)
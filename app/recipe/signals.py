@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe, RecipeIngredient
+from recipe.caching import bump_version_on_commit, owned_ids_namespace
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+def invalidate_recipes(sender, instance, **kwargs):
+    """Invalidate cached recipe data of the owner"""
+    bump_version_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    """Invalidate cached recipe data when a quantity changes"""
+    user_id = Recipe.objects.filter(pk=instance.recipe_id).values_list(
+        'user_id', flat=True
+    ).first()
+    if user_id is not None:
+        bump_version_on_commit(user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, **kwargs):
+    """Invalidate cached recipe data when tags are added or removed"""
+    if action.startswith('post_') and isinstance(instance, Recipe):
+        bump_version_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owned_ids(sender, instance, created=True, **kwargs):
+    """Invalidate the cached ids owned by a user when one is added or
+    deleted, renames keep the ids"""
+    if created:
+        bump_version_on_commit(instance.user_id, owned_ids_namespace(sender))
@@ -0,0 +1,12 @@
+"""Similar recipes from the tags and ingredients they share, scored over
+the postings of the user, see recipe.postings"""
+from recipe import postings
+
+SIMILARITY_METRICS = ('jaccard', 'cosine')
+
+
+def similar_recipes(user_id, recipe_id, limit=10, metric='jaccard'):
+    """Return the (recipe id, score) of the recipes of a user most similar
+    to one of them, best first"""
+    index = postings.get_index(user_id, build_missing=True)
+    return index.similar(recipe_id, limit, metric)
@@ -0,0 +1,91 @@
+"""Recipe JSON built by PostgreSQL.
+
+The expressions below produce, for each row of a recipe queryset, the same
+JSON document as RecipeSerializer or RecipeDetailSerializer, so responses
+can be streamed from the database without creating model instances. Tags
+and ingredients are in the order they were added to the recipe.
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from core.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+SQL_JSON_CHUNK_SIZE = 2000
+
+_tables = {
+    'recipe': Recipe._meta.db_table,
+    'recipe_tags': Recipe.tags.through._meta.db_table,
+    'recipe_ingredient': RecipeIngredient._meta.db_table,
+    'tag': Tag._meta.db_table,
+    'ingredient': Ingredient._meta.db_table,
+}
+_tables = {name: connection.ops.quote_name(table)
+           for name, table in _tables.items()}
+
+RECIPE_LIST_JSON = """json_build_object(
+    'id', {recipe}.id,
+    'title', {recipe}.title,
+    'ingredients', ARRAY(
+        SELECT ri.ingredient_id FROM {recipe_ingredient} ri
+        WHERE ri.recipe_id = {recipe}.id ORDER BY ri.id
+    ),
+    'tags', ARRAY(
+        SELECT rt.tag_id FROM {recipe_tags} rt
+        WHERE rt.recipe_id = {recipe}.id ORDER BY rt.id
+    ),
+    'time_minutes', {recipe}.time_minutes,
+    'price', {recipe}.price::text,
+    'link', {recipe}.link
+)::text""".format(**_tables)
+
+RECIPE_DETAIL_JSON = """json_build_object(
+    'id', {recipe}.id,
+    'title', {recipe}.title,
+    'ingredients', (
+        SELECT coalesce(json_agg(json_build_object(
+            'id', ri.ingredient_id,
+            'name', i.name,
+            'amount', ri.amount,
+            'unit_of_measurement', ri.unit_of_measurement
+        ) ORDER BY ri.id), '[]')
+        FROM {recipe_ingredient} ri
+        JOIN {ingredient} i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = {recipe}.id
+    ),
+    'tags', (
+        SELECT coalesce(json_agg(json_build_object(
+            'id', t.id,
+            'name', t.name
+        ) ORDER BY rt.id), '[]')
+        FROM {recipe_tags} rt
+        JOIN {tag} t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = {recipe}.id
+    ),
+    'time_minutes', {recipe}.time_minutes,
+    'price', {recipe}.price::text,
+    'link', {recipe}.link
+)::text""".format(**_tables)
+
+
+def json_rows(queryset, expression, chunk_size=SQL_JSON_CHUNK_SIZE):
+    """Yield the JSON text of every recipe of the queryset"""
+    return queryset.annotate(
+        recipe_json=RawSQL(expression, [])
+    ).values_list('recipe_json', flat=True).iterator(chunk_size=chunk_size)
+
+
+def stream_list(queryset, expression=RECIPE_LIST_JSON):
+    """Yield a JSON array of the recipes of the queryset, in pieces"""
+    separator = '['
+    for row in json_rows(queryset, expression):
+        yield separator + row
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def detail(queryset, pk):
+    """Return the detail JSON and the version of a recipe of the queryset,
+    or None"""
+    return queryset.filter(pk=pk).annotate(
+        recipe_json=RawSQL(RECIPE_DETAIL_JSON, [])
+    ).values_list('recipe_json', 'version').first()
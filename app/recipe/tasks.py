@@ -0,0 +1,9 @@
+from core import jobs
+from recipe import postings
+
+
+@jobs.task
+def build_recipe_index(user_id, version):
+    """Save the tag and ingredient postings of a user for the workers to
+    memory-map"""
+    postings.build(user_id, version)
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase, override_settings
+
+from recipe.checks import check_index_cache
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+DATABASE = {'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'cache_table',
+}}
+
+
+class IndexCacheCheckTests(SimpleTestCase):
+    """Test the check of the cache shared with saved indexes"""
+
+    @override_settings(RECIPE_INDEX_ROOT='/vol/web/index', CACHES=LOCMEM)
+    def test_saved_indexes_need_shared_cache(self):
+        """Test saving indexes with a cache of each process is an error"""
+        errors = check_index_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+
+    @override_settings(RECIPE_INDEX_ROOT='/vol/web/index', CACHES=DATABASE)
+    def test_saved_indexes_with_shared_cache(self):
+        """Test saving indexes with a shared cache passes"""
+        self.assertEqual(check_index_cache(None), [])
+
+    @override_settings(RECIPE_INDEX_ROOT='', CACHES=LOCMEM)
+    def test_indexes_in_memory(self):
+        """Test indexes kept in memory need no shared cache"""
+        self.assertEqual(check_index_cache(None), [])
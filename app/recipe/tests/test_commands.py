@@ -0,0 +1,60 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe
+
+
+class CommandTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+
+    def test_import_recipes(self):
+        """Test importing recipes from a file in chunks"""
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as tfile:
+            for i in range(5):
+                tfile.write(json.dumps({'title': f'Recipe {i}',
+                                        'time_minutes': i, 'price': i}))
+                tfile.write('\n')
+            tfile.flush()
+            call_command('import_recipes', tfile.name, user=self.user.email,
+                         chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_import_recipes_unknown_user(self):
+        """Test that importing for an unknown user fails"""
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', '-', user='nobody@pythonapp.com')
+
+    def test_explain_api_queries(self):
+        """Test that the plans of every query of the recipe API are shown"""
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=5)
+        out = StringIO()
+        call_command('explain_api_queries', user=self.user.email, stdout=out)
+
+        self.assertIn('recipe list (200', out.getvalue())
+        self.assertIn('recipe detail as database JSON (200', out.getvalue())
+        self.assertIn('Every query uses indexes', out.getvalue())
+
+    def test_explain_api_queries_flags_sequential_scans(self):
+        """Test that sequential scans of tables over the limit fail"""
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=5)
+        with connection.cursor() as cursor:
+            for setting in ('indexscan', 'indexonlyscan', 'bitmapscan'):
+                cursor.execute(f'SET LOCAL enable_{setting} = off')
+
+        with self.assertRaises(CommandError):
+            call_command('explain_api_queries', user=self.user.email,
+                         min_rows=0, stdout=StringIO())
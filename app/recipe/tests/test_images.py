@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Recipe
+from recipe import images
+from recipe.tests.test_recipe_api import sample_recipe, sample_photo
+
+
+class ImageHashTests(TestCase):
+    """Test perceptual hashes and the lookup of near duplicates"""
+
+    def test_dhash_survives_reencoding(self):
+        """Test resized and re-encoded copies of a photo hash alike"""
+        original = images.dhash(sample_photo())
+        copies = [
+            sample_photo(size=48, quality=50),
+            sample_photo(size=128, quality=30),
+            sample_photo(image_format='PNG'),
+        ]
+
+        for copy in copies:
+            self.assertLessEqual(
+                images.distance(original, images.dhash(copy)),
+                images.MAX_DISTANCE
+            )
+        self.assertGreater(
+            images.distance(original, images.dhash(sample_photo(seed=2))),
+            images.MAX_DISTANCE
+        )
+
+    def test_dhash_rewinds_file(self):
+        """Test the file can be stored after hashing it"""
+        photo = sample_photo()
+        images.dhash(photo)
+
+        self.assertEqual(photo.tell(), 0)
+
+    def test_hash_bands(self):
+        """Test bands are tagged with their position"""
+        self.assertEqual(images.hash_bands(0), [0, 65536, 131072, 196608])
+        self.assertEqual(images.hash_bands(-1),
+                         [65535, 131071, 196607, 262143])
+
+    def test_near_duplicates(self):
+        """Test photos a few bits apart are found, closest first"""
+        user = get_user_model().objects.create_user('python@pythonapp.com',
+                                                    'password1')
+        image_hash = images.dhash(sample_photo())
+        for title, bits in (('Same', image_hash), ('Close', image_hash ^ 6),
+                            ('Far', image_hash ^ 0xff)):
+            recipe = sample_recipe(user=user, title=title)
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image=f'{title}.jpg', image_hash=bits,
+                image_hash_bands=images.hash_bands(bits)
+            )
+
+        found = images.near_duplicates(Recipe.objects.all(), image_hash)
+
+        self.assertEqual([recipe.title for recipe in found],
+                         ['Same', 'Close'])
@@ -37,10 +37,8 @@ class PrivateIngredientsApiTests(TestCase):
 
     def test_retrieve_ingredients_list(self):
         """Test retrieving a list of ingredients"""
-        Ingredient.objects.create(user=self.user, name="Kale", amount=1 / 4,
-                                  unit_of_measurement="lb")
-        Ingredient.objects.create(user=self.user, name="Salt", amount=1 / 2,
-                                  unit_of_measurement="teaspoon")
+        Ingredient.objects.create(user=self.user, name="Kale")
+        Ingredient.objects.create(user=self.user, name="Salt")
         resp = self.client.get(INGREDIENTS_URL)
 
         ingredients = Ingredient.objects.all().order_by('-name')
@@ -54,9 +52,8 @@ class PrivateIngredientsApiTests(TestCase):
             'other@pythonapp.com',
             'testpass123'
         )
-        Ingredient.objects.create(user=user2, name='Pineapple', amount=1)
-        ingredient = Ingredient.objects.create(user=self.user, name='Mango',
-                                               amount=2)
+        Ingredient.objects.create(user=user2, name='Pineapple')
+        ingredient = Ingredient.objects.create(user=self.user, name='Mango')
 
         resp = self.client.get(INGREDIENTS_URL)
 
@@ -66,22 +63,29 @@ class PrivateIngredientsApiTests(TestCase):
 
     def test_create_ingredients_successful(self):
         """Test that creating ingredients is successful"""
-        payload = {'name': 'Cabbage', 'amount': 1/3}
+        payload = {'name': 'Cabbage'}
         self.client.post(INGREDIENTS_URL, payload)
         exists = Ingredient.objects.filter(
             user=self.user,
-            name=payload['name'],
-            amount=payload['amount']
+            name=payload['name']
         ).exists()
         self.assertTrue(exists)
 
     def test_create_ingredients_invalid(self):
         """Test creating invalid ingredients fail"""
-        payload = {'name': 'Carrot'}
-        payload2 = {'name': '', 'amount': 4}
+        payload = {'name': ''}
 
         resp = self.client.post(INGREDIENTS_URL, payload)
-        resp2 = self.client.post(INGREDIENTS_URL, payload2)
 
         self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertEqual(resp2.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_duplicate_ingredient_invalid(self):
+        """Test that an ingredient name is only in the catalog once"""
+        Ingredient.objects.create(user=self.user, name='Carrot')
+
+        resp = self.client.post(INGREDIENTS_URL, {'name': 'Carrot'})
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 1
+        )
@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, \
+    override_settings
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Tag
+from recipe import postings
+from recipe.caching import bump_version, get_version
+from recipe.postings import RecipeIndex
+from recipe.tests.test_recipe_api import RECIPES_URL, sample_recipe, \
+    sample_tag, sample_ingredient, add_ingredient
+
+
+class RecipeIndexTests(TestCase):
+    """Test looking recipes up by their tags and ingredients"""
+
+    def setUp(self) -> None:
+        # Features are tag ids times 2 and ingredient ids times 2 plus 1
+        self.index = RecipeIndex.from_pairs(np.array([
+            (1, 2), (1, 4), (1, 3),
+            (2, 2), (2, 5),
+            (3, 4), (3, 3),
+            (4, 7),
+        ]))
+
+    def test_recipes_with_tags(self):
+        """Test recipes with any of the tags are found"""
+        self.assertEqual(self.index.recipes_with(tag_ids=[1, 2]).tolist(),
+                         [1, 2, 3])
+
+    def test_recipes_with_tags_and_ingredients(self):
+        """Test tags and ingredients must both match"""
+        self.assertEqual(
+            self.index.recipes_with(tag_ids=[1], ingredient_ids=[1]).tolist(),
+            [1]
+        )
+
+    def test_unknown_ids(self):
+        """Test ids no recipe has match nothing"""
+        self.assertEqual(self.index.recipes_with(tag_ids=[9]).tolist(), [])
+
+    def test_save_and_load(self):
+        """Test a saved index is memory-mapped with the same answers"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, '1', '5')
+        self.index.save(path)
+        self.index.save(path)
+
+        loaded = RecipeIndex.load(path)
+
+        self.assertIsInstance(loaded.feature_rows, np.memmap)
+        self.assertEqual(loaded.recipes_with(tag_ids=[1, 2]).tolist(),
+                         [1, 2, 3])
+        self.assertEqual(loaded.similar(1), self.index.similar(1))
+        self.assertEqual(os.listdir(os.path.join(root, '1')), ['5'])
+
+
+class SavedIndexTests(TestCase):
+    """Test indexes built by jobs and shared through files"""
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(RECIPE_INDEX_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.rice = sample_ingredient(user=self.user, name='Rice')
+        self.curry = sample_recipe(user=self.user, title='Curry')
+        self.curry.tags.add(self.vegan)
+        add_ingredient(self.curry, self.rice)
+        self.salad = sample_recipe(user=self.user, title='Salad')
+        self.salad.tags.add(self.vegan)
+
+    def test_index_built_by_job(self):
+        """Test a missing index is queued once, then memory-mapped"""
+        self.assertIsNone(postings.get_index(self.user.pk))
+        self.assertIsNone(postings.get_index(self.user.pk))
+        self.assertEqual(
+            Job.objects.filter(task='recipe.tasks.build_recipe_index').count(),
+            1
+        )
+
+        self.assertTrue(jobs.run_next())
+        index = postings.get_index(self.user.pk)
+
+        self.assertIsInstance(index.recipe_ids, np.memmap)
+
+    def test_new_version_replaces_index(self):
+        """Test a change of the recipes swaps the index for a new one and
+        removes the old files"""
+        old_version = get_version(self.user.pk)
+        postings.build(self.user.pk, old_version)
+        self.assertIsNotNone(postings.get_index(self.user.pk))
+
+        bump_version(self.user.pk)
+        self.assertIsNone(postings.get_index(self.user.pk))
+        jobs.run_next()
+
+        self.assertIsNotNone(postings.get_index(self.user.pk))
+        self.assertEqual(os.listdir(os.path.join(self.root,
+                                                 str(self.user.pk))),
+                         [str(get_version(self.user.pk))])
+
+    def test_filter_with_index(self):
+        """Test recipes are filtered through the index like through SQL"""
+        params = {'tags': f'{self.vegan.id}', 'ingredients': f'{self.rice.id}'}
+        without_index = self.client.get(RECIPES_URL, params)
+        postings.build(self.user.pk, get_version(self.user.pk))
+
+        with self.assertNumQueries(1):
+            with_index = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(with_index.data, without_index.data)
+        self.assertEqual([row['title'] for row in with_index.data],
+                         ['Curry'])
+
+
+class SavedIndexInvalidationTests(TransactionTestCase):
+    """Test saved indexes are not used once recipes changed"""
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(RECIPE_INDEX_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_filter_after_tag_deleted(self):
+        """Test deleting a tag, which removes it from recipes without
+        m2m_changed, replaces the index"""
+        vegan = sample_tag(user=self.user, name='Vegan')
+        sample_recipe(user=self.user, title='Curry').tags.add(vegan)
+        postings.build(self.user.pk, get_version(self.user.pk))
+        self.assertEqual(len(self.client.get(RECIPES_URL,
+                                             {'tags': vegan.id}).data), 1)
+
+        Tag.objects.filter(pk=vegan.pk).delete()
+        resp = self.client.get(RECIPES_URL, {'tags': vegan.id})
+
+        self.assertEqual(resp.data, [])
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import serializers
+from recipe.read_serializers import ReadSerializer
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient, add_ingredient
+
+
+class ReadSerializerTests(TestCase):
+    """Test that read serializers match the model serializers"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        vegan = sample_tag(user=self.user, name='Vegan')
+        dessert = sample_tag(user=self.user, name='Dessert')
+        sugar = sample_ingredient(user=self.user, name='Sugar')
+        cream = sample_ingredient(user=self.user, name='Cream')
+
+        cheesecake = sample_recipe(user=self.user, title='Cheesecake',
+                                   price=12.5, link='https://example.com')
+        cheesecake.tags.add(vegan, dessert)
+        add_ingredient(cheesecake, sugar, 100, 'g')
+        add_ingredient(cheesecake, cream, None, None)
+        sorbet = sample_recipe(user=self.user, title='Sorbet', price=3)
+        sorbet.tags.add(vegan)
+        sample_recipe(user=self.user, title='Plain', price=0.1)
+
+    def assertSameOutput(self, serializer_class, queryset):
+        """Assert both serializers render the queryset to the same bytes"""
+        expected = serializer_class(queryset, many=True).data
+        data = ReadSerializer(serializer_class).data(queryset)
+
+        self.assertEqual(JSONRenderer().render(data),
+                         JSONRenderer().render(expected))
+
+    def test_tags(self):
+        """Test reading tags"""
+        self.assertSameOutput(serializers.TagSerializer,
+                              Tag.objects.order_by('-name'))
+
+    def test_ingredients(self):
+        """Test reading ingredients"""
+        self.assertSameOutput(serializers.IngredientSerializer,
+                              Ingredient.objects.order_by('-name'))
+
+    def test_recipes(self):
+        """Test reading recipes with their tag and ingredient ids"""
+        self.assertSameOutput(serializers.RecipeSerializer,
+                              Recipe.objects.order_by('-id'))
+
+    def test_recipes_query_count(self):
+        """Test that recipes with their relations are read in one query"""
+        read_serializer = ReadSerializer(serializers.RecipeSerializer)
+        read_serializer.compiled
+
+        with self.assertNumQueries(1):
+            data = read_serializer.data(Recipe.objects.all())
+
+        self.assertEqual(len(data), 3)
@@ -1,6 +1,9 @@
+import io
+import json
 import tempfile
 import os
 
+import numpy as np
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -8,7 +11,7 @@ from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, RecipeIngredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -29,13 +32,32 @@ def sample_tag(user, name='Main Course'):
     return Tag.objects.create(user=user, name=name)
 
 
-def sample_ingredient(user,
-                      name='Cinnamon',
-                      amount=1/2,
-                      unit_of_measurement='teaspoon'):
+def sample_ingredient(user, name='Cinnamon'):
     """Create and return a sample ingredient"""
-    return Ingredient.objects.create(user=user, name=name, amount=amount,
-                                     unit_of_measurement=unit_of_measurement)
+    return Ingredient.objects.create(user=user, name=name)
+
+
+def sample_photo(seed=1, size=64, image_format='JPEG', quality=95):
+    """Return a file with a smooth random picture, the same for a seed"""
+    pixels = np.random.RandomState(seed).randint(0, 256, (8, 8, 3))
+    image = Image.fromarray(pixels.astype('uint8')).resize((size, size),
+                                                           Image.BILINEAR)
+    file = io.BytesIO()
+    file.name = f'photo.{image_format.lower()}'
+    image.save(file, format=image_format, quality=quality)
+    file.seek(0)
+    return file
+
+
+def add_ingredient(recipe, ingredient, amount=1/2,
+                   unit_of_measurement='teaspoon'):
+    """Add an ingredient with its quantity to a recipe"""
+    return RecipeIngredient.objects.create(
+        recipe=recipe,
+        ingredient=ingredient,
+        amount=amount,
+        unit_of_measurement=unit_of_measurement
+    )
 
 
 def sample_recipe(user, **params):
@@ -105,7 +127,7 @@ class PrivateRecipeApiTest(TestCase):
         """Test viewing a recipe detail"""
         recipe = sample_recipe(user=self.user)
         recipe.tags.add(sample_tag(user=self.user))
-        recipe.ingredients.add(sample_ingredient(user=self.user))
+        add_ingredient(recipe, sample_ingredient(user=self.user))
 
         url = detail_url(recipe.id)
         resp = self.client.get(url)
@@ -149,10 +171,8 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(tag2, tags)
 
     def test_create_recipe_with_ingredients(self):
-        ingredient1 = sample_ingredient(user=self.user, name='Prawns',
-                                        amount=1, unit_of_measurement='pounds')
-        ingredient2 = sample_ingredient(user=self.user, name='Garlic',
-                                        amount=4, unit_of_measurement='cloves')
+        ingredient1 = sample_ingredient(user=self.user, name='Prawns')
+        ingredient2 = sample_ingredient(user=self.user, name='Garlic')
 
         payload = {
             'title': 'Ajillo',
@@ -169,6 +189,43 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_ingredient_quantities(self):
+        """Test creating a recipe with the amount of each ingredient"""
+        ingredient = sample_ingredient(user=self.user, name='Prawns')
+        payload = {
+            'title': 'Ajillo',
+            'ingredients': [{'id': ingredient.id, 'amount': 1,
+                             'unit_of_measurement': 'pounds'}],
+            'tags': [],
+            'time_minutes': 30,
+            'price': 25.00
+        }
+
+        resp = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data['ingredients'], [ingredient.id])
+        recipe_ingredient = RecipeIngredient.objects.get(
+            recipe_id=resp.data['id']
+        )
+        self.assertEqual(recipe_ingredient.ingredient, ingredient)
+        self.assertEqual(recipe_ingredient.amount, 1)
+        self.assertEqual(recipe_ingredient.unit_of_measurement, 'pounds')
+
+    def test_partial_update_recipe_ingredients(self):
+        """Test replacing the ingredients of a recipe with PATCH"""
+        recipe = sample_recipe(user=self.user)
+        add_ingredient(recipe, sample_ingredient(user=self.user))
+        flour = sample_ingredient(user=self.user, name='Flour')
+        payload = {'ingredients': [{'id': flour.id, 'amount': 2,
+                                    'unit_of_measurement': 'cups'}]}
+
+        self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        recipe_ingredient = recipe.recipe_ingredients.get()
+        self.assertEqual(recipe_ingredient.ingredient, flour)
+        self.assertEqual(recipe_ingredient.amount, 2)
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with PATCH"""
         recipe = sample_recipe(user=self.user)
@@ -204,6 +261,52 @@ class PrivateRecipeApiTest(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_retrieve_recipe_etag(self):
+        """Test that a recipe detail has its version as ETag only"""
+        recipe = sample_recipe(user=self.user)
+
+        resp = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(resp['ETag'], '"1"')
+        self.assertNotIn('version', resp.data)
+
+    def test_update_recipe_if_match(self):
+        """Test updating a recipe at the version the client read"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        resp = self.client.patch(detail_url(recipe.id), {'title': 'Soup'},
+                                 HTTP_IF_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['ETag'], '"2"')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Soup')
+
+    def test_update_recipe_if_match_conflict(self):
+        """Test that an update of a recipe changed meanwhile fails"""
+        recipe = sample_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        self.client.patch(detail_url(recipe.id), {'title': 'Web'})
+
+        resp = self.client.patch(detail_url(recipe.id), {'title': 'Phone'},
+                                 HTTP_IF_MATCH=etag)
+
+        self.assertEqual(resp.status_code,
+                         status.HTTP_412_PRECONDITION_FAILED)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Web')
+
+    def test_update_recipe_invalid_if_match(self):
+        """Test that an If-Match which is no version fails"""
+        recipe = sample_recipe(user=self.user)
+
+        resp = self.client.patch(detail_url(recipe.id), {'title': 'Soup'},
+                                 HTTP_IF_MATCH='"abc"')
+
+        self.assertEqual(resp.status_code,
+                         status.HTTP_412_PRECONDITION_FAILED)
+
 
 class RecipeImageUploadTests(TestCase):
     def setUp(self) -> None:
@@ -232,6 +335,40 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', resp.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_same_photo_reuses_file(self):
+        """Test a re-encoded copy of a photo of the user is not stored again,
+        and the recipes are listed as sharing their photo"""
+        other = sample_recipe(user=self.user, title='Copy')
+        self.client.post(image_upload_url(self.recipe.id),
+                         {'image': sample_photo()}, format='multipart')
+        resp = self.client.post(image_upload_url(other.id),
+                                {'image': sample_photo(size=48, quality=50)},
+                                format='multipart')
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(other.image.name, self.recipe.image.name)
+        self.assertEqual(other.image_hash, self.recipe.image_hash)
+
+        resp = self.client.get(
+            reverse('recipe:recipe-same-photo', args=[self.recipe.id])
+        )
+        self.assertEqual([row['id'] for row in resp.data], [other.id])
+
+    def test_upload_other_photo_stored(self):
+        """Test a different photo is stored as a file of its own"""
+        other = sample_recipe(user=self.user, title='Other')
+        self.client.post(image_upload_url(self.recipe.id),
+                         {'image': sample_photo()}, format='multipart')
+        self.client.post(image_upload_url(other.id),
+                         {'image': sample_photo(seed=2)}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertNotEqual(other.image.name, self.recipe.image.name)
+        other.image.delete()
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -239,6 +376,38 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_without_image(self):
+        """Test a request without an image leaves the image as it is"""
+        self.client.post(image_upload_url(self.recipe.id),
+                         {'image': sample_photo()}, format='multipart')
+        self.recipe.refresh_from_db()
+
+        resp = self.client.post(image_upload_url(self.recipe.id), {},
+                                format='multipart')
+
+        image_hash = self.recipe.image_hash
+        self.recipe.refresh_from_db()
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.recipe.image)
+        self.assertEqual(self.recipe.image_hash, image_hash)
+
+    def test_upload_empty_image_removes_it(self):
+        """Test an empty image removes the image and its hash"""
+        self.client.post(image_upload_url(self.recipe.id),
+                         {'image': sample_photo()}, format='multipart')
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        resp = self.client.post(image_upload_url(self.recipe.id),
+                                {'image': ''}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.recipe.image)
+        self.assertIsNone(self.recipe.image_hash)
+        self.assertIsNone(self.recipe.image_hash_bands)
+        self.recipe.image.storage.delete(name)
+
     def test_filter_recipes_by_tags(self):
         """Test ruturning recipes with specific tags"""
         recipe1 = sample_recipe(user=self.user, title='Thai curry')
@@ -266,13 +435,13 @@ class RecipeImageUploadTests(TestCase):
         """Test returning recipes with specific ingredients"""
         recipe1 = sample_recipe(self.user, title='Rice and beans')
         recipe2 = sample_recipe(self.user, title='Chicken pasta')
-        ingredient1 = sample_ingredient(user=self.user, name='Black Beans',
-                                        amount=1, unit_of_measurement='cup')
-        ingredient2 = sample_ingredient(user=self.user,
-                                        name='Chicken breast', amount=2)
+        ingredient1 = sample_ingredient(user=self.user, name='Black Beans')
+        ingredient2 = sample_ingredient(user=self.user, name='Chicken breast')
 
-        recipe1.ingredients.add(ingredient1)
-        recipe2.ingredients.add(ingredient2)
+        add_ingredient(recipe1, ingredient1, amount=1,
+                       unit_of_measurement='cup')
+        add_ingredient(recipe2, ingredient2, amount=2,
+                       unit_of_measurement=None)
 
         recipe3 = sample_recipe(user=self.user, title='Steak and mushrooms')
 
@@ -287,3 +456,178 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn(serializer1.data, resp.data)
         self.assertIn(serializer2.data, resp.data)
         self.assertNotIn(serializer3.data, resp.data)
+
+    def test_filter_with_invalid_ids(self):
+        """Test tag and ingredient filters that are not ids are rejected"""
+        for params in ({'tags': 'x'}, {'tags': '1,,2'},
+                       {'ingredients': 'x'}, {'ingredients': '-1'},
+                       {'ingredients': str(2 ** 31)}):
+            resp = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(set(resp.data), set(params))
+
+
+class RecipeFacetTests(TestCase):
+    """Test range filters and facet counts of the recipe list"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+        self.rice = sample_ingredient(user=self.user, name='Rice')
+        self.curry = sample_recipe(user=self.user, title='Curry',
+                                   price=8, time_minutes=40)
+        self.curry.tags.add(self.vegan)
+        add_ingredient(self.curry, self.rice)
+        self.salad = sample_recipe(user=self.user, title='Salad',
+                                   price=5, time_minutes=10)
+        self.salad.tags.add(self.vegan, self.quick)
+        self.steak = sample_recipe(user=self.user, title='Steak',
+                                   price=20, time_minutes=15)
+
+    def titles(self, resp):
+        return [row['title'] for row in resp.data]
+
+    def test_filter_by_price_and_time(self):
+        """Test recipes are filtered by ranges of price and time"""
+        by_price = self.client.get(RECIPES_URL, {'min_price': '5',
+                                                 'max_price': '8.00'})
+        by_time = self.client.get(RECIPES_URL, {'max_time': 15,
+                                                'tags': f'{self.vegan.id}'})
+
+        self.assertEqual(self.titles(by_price), ['Salad', 'Curry'])
+        self.assertEqual(self.titles(by_time), ['Salad'])
+
+    def test_invalid_ranges(self):
+        """Test range filters that are not numbers are rejected"""
+        resp = self.client.get(RECIPES_URL, {'min_price': 'cheap',
+                                             'max_time': '1.5'})
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(resp.data), {'min_price', 'max_time'})
+
+    def test_facets(self):
+        """Test the tags and ingredients of the filtered recipes are counted
+        in one query each"""
+        with self.assertNumQueries(3):
+            resp = self.client.get(RECIPES_URL, {
+                'max_price': 10, 'facets': 'tags,ingredients'
+            })
+
+        self.assertEqual([row['title'] for row in resp.data['results']],
+                         ['Salad', 'Curry'])
+        self.assertEqual(resp.data['facets'], {
+            'tags': [
+                {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+                {'id': self.quick.id, 'name': 'Quick', 'count': 1},
+            ],
+            'ingredients': [
+                {'id': self.rice.id, 'name': 'Rice', 'count': 1},
+            ],
+        })
+
+    def test_facets_with_database_json(self):
+        """Test facets are added to lists built by the database"""
+        with self.settings(RECIPE_JSON_IN_DATABASE=True):
+            resp = self.client.get(RECIPES_URL, {'facets': 'tags'})
+        content = json.loads(b''.join(resp.streaming_content))
+
+        self.assertEqual(len(content['results']), 3)
+        self.assertEqual(content['facets']['tags'][0]['count'], 2)
+
+    def test_unknown_facet(self):
+        """Test only tags and ingredients can be counted"""
+        resp = self.client.get(RECIPES_URL, {'facets': 'tags,colours'})
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeOrderingTests(TestCase):
+    """Test ordering the recipe list and paging it by keyset"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        for title, price, minutes in (('Curry', 8, 40), ('Salad', 5, 10),
+                                      ('Steak', 20, 15), ('Soup', 5, 30),
+                                      ('Bread', 3, 90)):
+            sample_recipe(user=self.user, title=title, price=price,
+                          time_minutes=minutes)
+
+    def pages(self, params):
+        """Return the titles of every page of the list"""
+        pages = []
+        resp = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            pages.append([row['title'] for row in resp.data['results']])
+            if resp.data['next'] is None:
+                return pages
+            resp = self.client.get(resp.data['next'])
+
+    def test_ordering(self):
+        """Test recipes are ordered by an allowed field, ties by id"""
+        resp = self.client.get(RECIPES_URL, {'ordering': 'price',
+                                             'max_time': 40})
+
+        self.assertEqual([row['title'] for row in resp.data],
+                         ['Salad', 'Soup', 'Curry', 'Steak'])
+
+    def test_keyset_pages(self):
+        """Test following the next links lists every recipe once"""
+        self.assertEqual(self.pages({'ordering': '-price', 'limit': 2}),
+                         [['Steak', 'Curry'], ['Soup', 'Salad'], ['Bread']])
+        self.assertEqual(self.pages({'ordering': 'title', 'limit': 3}),
+                         [['Bread', 'Curry', 'Salad'], ['Soup', 'Steak']])
+        self.assertEqual(self.pages({'limit': 5}),
+                         [['Bread', 'Soup', 'Steak', 'Salad', 'Curry']])
+
+    def test_page_queries(self):
+        """Test a page reads its keys, then its recipes"""
+        first = self.client.get(RECIPES_URL, {'ordering': 'time_minutes',
+                                              'limit': 2})
+
+        with self.assertNumQueries(2):
+            resp = self.client.get(first.data['next'])
+
+        self.assertEqual([row['title'] for row in resp.data['results']],
+                         ['Soup', 'Curry'])
+
+    def test_keyset_pages_with_database_json(self):
+        """Test pages built by the database have the same next links"""
+        with self.settings(RECIPE_JSON_IN_DATABASE=True):
+            resp = self.client.get(RECIPES_URL, {'ordering': 'price',
+                                                 'limit': 4})
+        content = json.loads(b''.join(resp.streaming_content))
+
+        self.assertEqual([row['title'] for row in content['results']],
+                         ['Bread', 'Salad', 'Soup', 'Curry'])
+        self.assertEqual(
+            self.pages({'ordering': 'price', 'limit': 4})[0],
+            [row['title'] for row in content['results']]
+        )
+        self.assertIsNotNone(content['next'])
+
+    def test_invalid_parameters(self):
+        """Test orderings outside the allow-list and bad cursors fail"""
+        first = self.client.get(RECIPES_URL, {'ordering': 'price',
+                                              'limit': 2})
+        cursor = first.data['next'].split('cursor=')[1]
+
+        for params in ({'ordering': 'user'}, {'ordering': '--price'},
+                       {'limit': 0}, {'limit': 'all'},
+                       {'limit': 2, 'cursor': 'abc'},
+                       {'ordering': 'title', 'limit': 2, 'cursor': cursor}):
+            resp = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
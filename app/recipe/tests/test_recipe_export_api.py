@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient, add_ingredient
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(TestCase):
+    """Test exporting the recipe library"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test that authentication is required to export"""
+        resp = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes with tags and ingredients as NDJSON"""
+        recipe = sample_recipe(user=self.user, title='Thai curry')
+        tag = sample_tag(user=self.user, name='Vegan')
+        ingredient = sample_ingredient(user=self.user, name='Coconut milk')
+        recipe.tags.add(tag)
+        add_ingredient(recipe, ingredient, amount=1,
+                       unit_of_measurement='can')
+        sample_recipe(user=self.user, title='Ajillo')
+
+        resp = self.client.get(EXPORT_URL)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]['title'], recipe.title)
+        self.assertEqual(rows[1]['price'], '5.00')
+        self.assertEqual(rows[1]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(rows[1]['ingredients'], [{
+            'id': ingredient.id,
+            'name': 'Coconut milk',
+            'amount': 1,
+            'unit_of_measurement': 'can',
+        }])
+        self.assertEqual(rows[0]['tags'], [])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        recipe = sample_recipe(user=self.user, title='Brisket')
+        recipe.tags.add(sample_tag(user=self.user, name='BBQ'))
+
+        resp = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+        content = b''.join(resp.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], recipe.title)
+        self.assertEqual(json.loads(rows[0]['tags'])[0]['name'], 'BBQ')
+
+    def test_export_limited_to_user(self):
+        """Test that only the recipes of the user are exported"""
+        user2 = get_user_model().objects.create_user(
+            'other@pythonapp.com',
+            'password2'
+        )
+        sample_recipe(user=user2, title='Not mine')
+        sample_recipe(user=self.user, title='Mine')
+
+        resp = self.client.get(EXPORT_URL)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['title'], 'Mine')
+
+    def test_export_invalid_format(self):
+        """Test that an unknown export format is rejected"""
+        resp = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,175 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.tests.test_recipe_api import sample_tag
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson_file(*records):
+    """Return an uploadable NDJSON file holding the records"""
+    content = '\n'.join(
+        record if isinstance(record, str) else json.dumps(record)
+        for record in records
+    )
+    return SimpleUploadedFile('recipes.ndjson', content.encode())
+
+
+class RecipeImportApiTests(TestCase):
+    """Test bulk importing a recipe library"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Test importing recipes with tags and ingredients"""
+        upload = ndjson_file({
+            'title': 'Thai curry',
+            'time_minutes': 40,
+            'price': '12.50',
+            'tags': ['Vegan', 'Spicy'],
+            'ingredients': [{'name': 'Coconut milk', 'amount': 1,
+                             'unit_of_measurement': 'can'}],
+        }, {
+            'title': 'Ajillo',
+            'time_minutes': 20,
+            'price': 9,
+            'tags': [{'name': 'Spicy'}],
+        })
+
+        resp = self.client.post(IMPORT_URL, {'file': upload},
+                                format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['imported'], 2)
+        self.assertEqual(resp.data['errors'], [])
+        recipe = Recipe.objects.get(user=self.user, title='Thai curry')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.get().name, 'Coconut milk')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_reuses_existing_tags(self):
+        """Test that tags are deduplicated by name for the user"""
+        tag = sample_tag(user=self.user, name='Vegan')
+        upload = ndjson_file({'title': 'Salad', 'time_minutes': 5,
+                              'price': 3, 'tags': ['Vegan']})
+
+        self.client.post(IMPORT_URL, {'file': upload}, format='multipart')
+
+        recipe = Recipe.objects.get(user=self.user, title='Salad')
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_import_reports_row_errors(self):
+        """Test that invalid rows are reported and valid rows imported"""
+        upload = ndjson_file(
+            {'title': 'Valid', 'time_minutes': 5, 'price': 3},
+            '{not json',
+            {'title': 'No time', 'price': 3},
+            {'title': 'Too expensive', 'time_minutes': 5, 'price': 5000},
+        )
+
+        resp = self.client.post(IMPORT_URL, {'file': upload},
+                                format='multipart')
+
+        self.assertEqual(resp.data['processed'], 4)
+        self.assertEqual(resp.data['imported'], 1)
+        self.assertEqual([e['line'] for e in resp.data['errors']], [2, 3, 4])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_import_reports_tags_and_ingredients_not_lists(self):
+        """Test that tags and ingredients other than lists are row errors"""
+        upload = ndjson_file(
+            {'title': 'Number', 'time_minutes': 5, 'price': 3, 'tags': 5},
+            {'title': 'Text', 'time_minutes': 5, 'price': 3, 'tags': 'abc'},
+            {'title': 'Object', 'time_minutes': 5, 'price': 3,
+             'ingredients': {'name': 'Rice'}},
+        )
+
+        resp = self.client.post(IMPORT_URL, {'file': upload},
+                                format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['line'] for e in resp.data['errors']], [1, 2, 3])
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_import_reports_undecodable_file(self):
+        """Test that a file that is not UTF-8 is reported from the line it
+        stops being readable"""
+        upload = SimpleUploadedFile('recipes.ndjson', json.dumps(
+            {'title': 'Valid', 'time_minutes': 5, 'price': 3}
+        ).encode() + b'\n{"title": "\xff"}\n')
+
+        resp = self.client.post(IMPORT_URL, {'file': upload},
+                                format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['imported'], 1)
+        self.assertEqual([e['line'] for e in resp.data['errors']], [2])
+
+    def test_import_reports_text_postgres_cannot_store(self):
+        """Test that NUL characters and lone surrogates are row errors
+        instead of failing the load of their chunk"""
+        upload = ndjson_file(
+            {'title': 'Valid', 'time_minutes': 5, 'price': 3},
+            {'title': 'Nul\u0000', 'time_minutes': 5, 'price': 3},
+            {'title': 'Soup', 'time_minutes': 5, 'price': 3,
+             'tags': ['\ud800']},
+        )
+
+        resp = self.client.post(IMPORT_URL, {'file': upload},
+                                format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['imported'], 1)
+        self.assertEqual([e['line'] for e in resp.data['errors']], [2, 3])
+
+    def test_import_reports_invalid_csv_rows(self):
+        """Test that rows the CSV reader refuses are row errors"""
+        content = b'title,time_minutes,price\nValid,5,3\nNul\x00,5,3\n'
+
+        resp = self.client.post(IMPORT_URL, {
+            'file': SimpleUploadedFile('recipes.csv', content),
+            'import_format': 'csv',
+        }, format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['imported'], 1)
+        self.assertEqual([e['line'] for e in resp.data['errors']], [3])
+
+    def test_import_csv_export_round_trip(self):
+        """Test that a CSV export can be imported again"""
+        upload = ndjson_file({'title': 'Brisket', 'time_minutes': 300,
+                              'price': 40, 'tags': ['BBQ']})
+        self.client.post(IMPORT_URL, {'file': upload}, format='multipart')
+        resp = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+        content = b''.join(resp.streaming_content)
+
+        resp = self.client.post(IMPORT_URL, {
+            'file': SimpleUploadedFile('recipes.csv', content),
+            'import_format': 'csv',
+        }, format='multipart')
+
+        self.assertEqual(resp.data['imported'], 1)
+        recipes = Recipe.objects.filter(user=self.user, title='Brisket')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_import_requires_file(self):
+        """Test that importing without a file fails"""
+        resp = self.client.post(IMPORT_URL, {}, format='multipart')
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
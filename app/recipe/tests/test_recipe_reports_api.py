@@ -0,0 +1,156 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import sample_recipe, sample_ingredient, \
+    add_ingredient
+
+TOTALS_URL = reverse('recipe:recipe-totals')
+SHOPPING_LIST_URL = reverse('recipe:shopping-list')
+
+
+class RecipeTotalsApiTests(TestCase):
+    """Test summing up prices and quantities of recipes"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+        self.milk = sample_ingredient(user=self.user, name='Milk')
+
+    def test_totals(self):
+        """Test totals per recipe and across the selected recipes"""
+        pancakes = sample_recipe(user=self.user, title='Pancakes', price=4)
+        add_ingredient(pancakes, self.flour, 250, 'g')
+        add_ingredient(pancakes, self.milk, 1, 'cup')
+        bread = sample_recipe(user=self.user, title='Bread', price=2.5)
+        add_ingredient(bread, self.flour, 1, 'kg')
+        sample_recipe(user=self.user, title='Not selected')
+
+        resp = self.client.get(TOTALS_URL,
+                               {'recipes': f'{pancakes.id},{bread.id}'})
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data['recipes']), 2)
+        self.assertEqual(resp.data['total']['price'], '6.50')
+        self.assertEqual(resp.data['total']['quantities'],
+                         {'g': 1250, 'ml': 236.5882365})
+        by_id = {recipe['id']: recipe for recipe in resp.data['recipes']}
+        self.assertEqual(by_id[bread.id]['quantities'], {'g': 1000})
+
+    def test_totals_limited_to_user(self):
+        """Test that recipes of other users are not summed up"""
+        user2 = get_user_model().objects.create_user(
+            'other@pythonapp.com',
+            'password2'
+        )
+        recipe = sample_recipe(user=user2)
+
+        resp = self.client.get(TOTALS_URL, {'recipes': f'{recipe.id}'})
+
+        self.assertEqual(resp.data['recipes'], [])
+        self.assertEqual(resp.data['total']['price'], '0.00')
+
+    def test_totals_with_invalid_ids(self):
+        """Test that selections that are not ids are rejected"""
+        resp = self.client.get(TOTALS_URL, {'recipes': 'a'})
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recipes', resp.data)
+
+
+class ShoppingListApiTests(TestCase):
+    """Test merging the ingredients of recipes into a shopping list"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+        self.pancakes = sample_recipe(user=self.user, title='Pancakes')
+        add_ingredient(self.pancakes, self.flour, 250, 'g')
+        self.bread = sample_recipe(user=self.user, title='Bread')
+        add_ingredient(self.bread, self.flour, 0.5, 'kg')
+        self.yeast = sample_ingredient(user=self.user, name='Yeast')
+        add_ingredient(self.bread, self.yeast, 1, 'packet')
+
+    def test_shopping_list(self):
+        """Test that quantities are summed per ingredient and unit"""
+        resp = self.client.get(
+            SHOPPING_LIST_URL,
+            {'recipes': f'{self.pancakes.id},{self.bread.id}'}
+        )
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data, [
+            {'id': self.flour.id, 'name': 'Flour', 'quantity': 750,
+             'unit': 'g', 'recipes': 2},
+            {'id': self.yeast.id, 'name': 'Yeast', 'quantity': 1,
+             'unit': 'packet', 'recipes': 1},
+        ])
+
+    def test_shopping_list_limited_to_user(self):
+        """Test that recipes of other users are not included"""
+        user2 = get_user_model().objects.create_user(
+            'other@pythonapp.com',
+            'password2'
+        )
+        self.client.force_authenticate(user2)
+
+        resp = self.client.get(SHOPPING_LIST_URL,
+                               {'recipes': f'{self.pancakes.id}'})
+
+        self.assertEqual(resp.data, [])
+
+    def test_shopping_list_with_invalid_ids(self):
+        """Test that selections that are not ids are rejected"""
+        for recipes in ('a', '1,,2'):
+            resp = self.client.get(SHOPPING_LIST_URL, {'recipes': recipes})
+
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('recipes', resp.data)
+
+    def test_shopping_list_requires_recipes(self):
+        """Test that at least one recipe has to be selected"""
+        resp = self.client.get(SHOPPING_LIST_URL)
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ShoppingListInvalidationTests(TransactionTestCase):
+    """Test that cached shopping lists are refreshed once changes commit"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+        self.pancakes = sample_recipe(user=self.user, title='Pancakes')
+        add_ingredient(self.pancakes, self.flour, 250, 'g')
+
+    def test_shopping_list_is_invalidated(self):
+        """Test that a cached shopping list is refreshed after a change"""
+        params = {'recipes': f'{self.pancakes.id}'}
+        self.client.get(SHOPPING_LIST_URL, params)
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[self.pancakes.id]),
+            {'ingredients': [{'id': self.flour.id, 'amount': 100,
+                              'unit_of_measurement': 'g'}]},
+            format='json'
+        )
+        resp = self.client.get(SHOPPING_LIST_URL, params)
+
+        self.assertEqual(resp.data[0]['quantity'], 100)
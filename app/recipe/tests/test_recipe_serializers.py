@@ -0,0 +1,161 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Recipe, RecipeIngredient
+from recipe.caching import owned_ids_lookups
+from recipe.serializers import RecipeSerializer
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient, add_ingredient
+
+
+class RecipeSerializerWriteTests(TestCase):
+    """Test writing recipes with their tags and ingredients"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.dessert = sample_tag(user=self.user, name='Dessert')
+        self.sugar = sample_ingredient(user=self.user, name='Sugar')
+        self.cream = sample_ingredient(user=self.user, name='Cream')
+
+    def serializer(self, instance=None, **data):
+        serializer = RecipeSerializer(instance, data=data,
+                                      partial=instance is not None)
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def test_create_queries(self):
+        """Test a recipe is created with one INSERT per table"""
+        serializer = self.serializer(
+            title='Cheesecake', time_minutes=30, price=12,
+            tags=[self.vegan.id, self.dessert.id],
+            ingredients=[self.sugar.id, self.cream.id]
+        )
+
+        # SAVEPOINT, 3 INSERTs and RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            recipe = serializer.save(user=self.user)
+
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_update_queries(self):
+        """Test relations are diffed into one DELETE and one INSERT each"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(self.vegan)
+        add_ingredient(recipe, self.sugar, 100, 'g')
+        add_ingredient(recipe, self.cream, 1, 'cup')
+        serializer = self.serializer(
+            recipe,
+            tags=[self.dessert.id],
+            ingredients=[
+                {'id': self.sugar.id, 'amount': 100,
+                 'unit_of_measurement': 'g'},
+                {'id': self.cream.id, 'amount': 2,
+                 'unit_of_measurement': 'cup'},
+            ]
+        )
+        sugar_row = recipe.recipe_ingredients.get(ingredient=self.sugar)
+
+        # SAVEPOINT, UPDATE, SELECT, DELETE and INSERT per relation, RELEASE
+        with self.assertNumQueries(9):
+            serializer.save()
+
+        self.assertEqual(list(recipe.tags.all()), [self.dessert])
+        self.assertEqual(
+            recipe.recipe_ingredients.get(ingredient=self.sugar).pk,
+            sugar_row.pk
+        )
+        self.assertEqual(
+            recipe.recipe_ingredients.get(ingredient=self.cream).amount, 2
+        )
+
+    def test_unchanged_relations_not_written(self):
+        """Test that relations given as they are only get read"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(self.vegan)
+        add_ingredient(recipe, self.sugar, 100, 'g')
+        serializer = self.serializer(
+            recipe, tags=[self.vegan.id],
+            ingredients=[{'id': self.sugar.id, 'amount': 100,
+                          'unit_of_measurement': 'g'}]
+        )
+
+        with self.assertNumQueries(5):
+            serializer.save()
+
+    def test_create_rolled_back_on_error(self):
+        """Test no half written recipe is left when a query fails"""
+        serializer = self.serializer(
+            title='Cheesecake', time_minutes=30, price=12,
+            tags=[self.vegan.id], ingredients=[self.sugar.id]
+        )
+
+        with patch.object(RecipeIngredient.objects, 'bulk_create',
+                          side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                serializer.save(user=self.user)
+
+        self.assertFalse(Recipe.objects.exists())
+
+
+class OwnedIdsValidationTests(TransactionTestCase):
+    """Test tag and ingredient ids are validated against cached id sets"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.sugar = sample_ingredient(user=self.user, name='Sugar')
+        self.request = APIRequestFactory().post('/')
+        self.request.user = self.user
+
+    def serializer(self, **data):
+        data = {'title': 'Cheesecake', 'time_minutes': 30, 'price': 12,
+                **data}
+        return RecipeSerializer(data=data, context={'request': self.request})
+
+    def test_known_ids_validated_without_queries(self):
+        """Test ids validated before are checked from memory"""
+        data = {'tags': [self.vegan.id],
+                'ingredients': [{'id': self.sugar.id, 'amount': 1}]}
+        self.assertTrue(self.serializer(**data).is_valid())
+        local_hits = owned_ids_lookups['tag-ids', 'local']
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.serializer(**data).is_valid())
+        self.assertEqual(owned_ids_lookups['tag-ids', 'local'],
+                         local_hits + 1)
+
+    def test_ids_of_other_users_rejected(self):
+        """Test tags and ingredients of another user cannot be used"""
+        other = get_user_model().objects.create_user('other@pythonapp.com',
+                                                     'password1')
+        serializer = self.serializer(
+            tags=[sample_tag(user=other, name='Vegan').id],
+            ingredients=[sample_ingredient(user=other, name='Sugar').id]
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors), {'tags', 'ingredients'})
+
+    def test_added_and_deleted_ids(self):
+        """Test the cached ids follow tags being added and deleted"""
+        def valid(tag):
+            return self.serializer(tags=[tag.id], ingredients=[]).is_valid()
+
+        self.assertTrue(valid(self.vegan))
+        self.assertTrue(valid(sample_tag(user=self.user, name='Dessert')))
+
+        Tag.objects.filter(pk=self.vegan.pk).delete()
+
+        self.assertFalse(valid(self.vegan))
@@ -0,0 +1,116 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.postings import RecipeIndex
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient, add_ingredient
+
+
+def similar_url(recipe_id):
+    """Return the URL of the recipes similar to a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarScoreTests(TestCase):
+    """Test scoring recipes by the features they share"""
+
+    def setUp(self) -> None:
+        # Recipe 1 has features 1, 2 and 3, recipe 2 shares two of them,
+        # recipes 3 and 4 one, recipe 5 none
+        self.index = RecipeIndex.from_pairs(np.array([
+            (1, 1), (1, 2), (1, 3),
+            (2, 1), (2, 2),
+            (3, 3), (3, 4), (3, 5), (3, 6),
+            (4, 1),
+            (5, 7),
+        ]))
+
+    def test_jaccard(self):
+        """Test shared features are weighed against all features"""
+        self.assertEqual(self.index.similar(1), [
+            (2, 2 / 3), (4, 1 / 3), (3, 1 / 6)
+        ])
+
+    def test_cosine(self):
+        """Test the cosine of the feature vectors can be used instead"""
+        scores = dict(self.index.similar(1, metric='cosine'))
+
+        self.assertAlmostEqual(scores[2], 2 / np.sqrt(6))
+        self.assertAlmostEqual(scores[3], 1 / np.sqrt(12))
+
+    def test_limit_keeps_newest_of_ties(self):
+        """Test the limit cuts ties in favour of the newest recipes"""
+        index = RecipeIndex.from_pairs(np.array([
+            (1, 1), (2, 1), (3, 1), (4, 1), (5, 1)
+        ]))
+
+        self.assertEqual(index.similar(3, limit=2), [(5, 1.0), (4, 1.0)])
+
+    def test_unknown_recipe(self):
+        """Test recipes without tags or ingredients have no similar ones"""
+        self.assertEqual(self.index.similar(6), [])
+
+
+class SimilarRecipesApiTests(TransactionTestCase):
+    """Test the similar recipes of the API"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+        self.rice = sample_ingredient(user=self.user, name='Rice')
+        self.curry = sample_recipe(user=self.user, title='Curry')
+        self.curry.tags.add(self.vegan, self.quick)
+        add_ingredient(self.curry, self.rice)
+        self.risotto = sample_recipe(user=self.user, title='Risotto')
+        add_ingredient(self.risotto, self.rice)
+
+    def test_similar_recipes(self):
+        """Test similar recipes are listed with their similarity"""
+        salad = sample_recipe(user=self.user, title='Salad')
+        salad.tags.add(self.vegan, self.quick)
+
+        resp = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['title'], row['similarity'])
+                          for row in resp.data],
+                         [('Salad', 0.6667), ('Risotto', 0.3333)])
+
+    def test_index_follows_changes(self):
+        """Test the index is built again after recipes change"""
+        self.client.get(similar_url(self.curry.id))
+        self.client.patch(reverse('recipe:recipe-detail',
+                                  args=[self.risotto.id]),
+                          {'tags': [self.vegan.id, self.quick.id]},
+                          format='json')
+
+        resp = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(resp.data[0]['similarity'], 1.0)
+
+    def test_invalid_parameters(self):
+        """Test unknown metrics and bad limits are rejected"""
+        for params in ({'metric': 'euclid'}, {'limit': 0},
+                       {'limit': 'ten'}):
+            resp = self.client.get(similar_url(self.curry.id), params)
+
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_of_other_user(self):
+        """Test the recipes of other users cannot be looked up"""
+        other = get_user_model().objects.create_user('other@pythonapp.com',
+                                                     'password1')
+
+        resp = self.client.get(similar_url(sample_recipe(user=other).id))
+
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,90 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import serializers
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient, add_ingredient, detail_url
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def content_of(res):
+    """Return the decoded JSON of a plain or streaming response"""
+    if res.streaming:
+        return json.loads(b''.join(res.streaming_content))
+
+    return json.loads(res.content)
+
+
+@override_settings(RECIPE_JSON_IN_DATABASE=True)
+class RecipeJSONInDatabaseTests(TestCase):
+    """Test recipe responses built by the database"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'python@pythonapp.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        vegan = sample_tag(user=self.user, name='Vegan')
+        dessert = sample_tag(user=self.user, name='Dessert')
+        sugar = sample_ingredient(user=self.user, name='Sugar')
+        cream = sample_ingredient(user=self.user, name='Cream')
+
+        self.cheesecake = sample_recipe(user=self.user, title='Cheesecake',
+                                        price=12.5, link='https://a.com')
+        self.cheesecake.tags.add(vegan, dessert)
+        add_ingredient(self.cheesecake, sugar, 100.5, 'g')
+        add_ingredient(self.cheesecake, cream, None, None)
+        self.sorbet = sample_recipe(user=self.user, title='Sorbet', price=3)
+        self.sorbet.tags.add(vegan)
+
+    def test_list_matches_serializer(self):
+        """Test the recipe list has the serializer output"""
+        res = self.client.get(RECIPES_URL)
+
+        expected = serializers.RecipeSerializer(
+            Recipe.objects.order_by('-id'), many=True
+        ).data
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(content_of(res), json.loads(json.dumps(expected)))
+
+    def test_list_filtered_empty(self):
+        """Test an empty recipe list is still a JSON array"""
+        res = self.client.get(RECIPES_URL, {'tags': '0'})
+
+        self.assertEqual(content_of(res), [])
+
+    def test_retrieve_matches_serializer(self):
+        """Test the recipe detail has the detail serializer output"""
+        res = self.client.get(detail_url(self.cheesecake.id))
+
+        expected = serializers.RecipeDetailSerializer(self.cheesecake).data
+        self.assertEqual(content_of(res), json.loads(json.dumps(expected)))
+        self.assertEqual(res['ETag'], f'"{self.cheesecake.version}"')
+
+    def test_retrieve_without_relations(self):
+        """Test a recipe without tags or ingredients has empty lists"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(content_of(res)['tags'], [])
+        self.assertEqual(content_of(res)['ingredients'], [])
+
+    def test_retrieve_other_user_not_found(self):
+        """Test recipes of other users are not found"""
+        other = get_user_model().objects.create_user('other@pythonapp.com',
+                                                     'password1')
+        recipe = sample_recipe(user=other)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, 404)
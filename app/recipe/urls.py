@@ -16,5 +16,7 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('shopping-list/', views.ShoppingListView.as_view(),
+         name='shopping-list'),
     path('', include(router.urls))
 ]
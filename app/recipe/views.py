@@ -1,10 +1,37 @@
-from rest_framework import viewsets, mixins, status
+import codecs
+import itertools
+import json
+
+from django.conf import settings
+from django.db.models.expressions import RawSQL
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework import viewsets, mixins, status, views, fields
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from core.concurrency import ConditionalUpdateMixin, etag
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import images, keyset, postings, serializers, similarity, \
+    sql_json
+from recipe.read_serializers import ReadSerializer
+from recipe.export import EXPORT_FORMATS
+from recipe.importer import import_recipes, IMPORT_FORMATS
+from recipe.reports import recipe_totals, shopping_list, facet_counts, \
+    FACETS
+
+# Range filters of the recipe list, by parameter
+RANGE_FILTERS = {
+    'min_price': ('price__gte',
+                  fields.DecimalField(max_digits=None, decimal_places=None)),
+    'max_price': ('price__lte',
+                  fields.DecimalField(max_digits=None, decimal_places=None)),
+    'min_time': ('time_minutes__gte', fields.IntegerField()),
+    'max_time': ('time_minutes__lte', fields.IntegerField()),
+}
 
 
 class BaseRecipeAttributesViewSet(viewsets.GenericViewSet,
@@ -22,44 +49,131 @@ class BaseRecipeAttributesViewSet(viewsets.GenericViewSet,
         """Create a new tag"""
         serializer.save(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        """List objects through the precompiled read serializer"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.read_serializer.data(queryset))
+
 
 class TagViewSet(BaseRecipeAttributesViewSet):
     """Manage tags in the DB"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    read_serializer = ReadSerializer(serializers.TagSerializer)
 
 
 class IngredientViewSet(BaseRecipeAttributesViewSet):
     """Manage ingredients in the DB"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    read_serializer = ReadSerializer(serializers.IngredientSerializer)
+
+
+def params_to_ids(qs, param):
+    """Convert a comma separated string of ids into a list of integers,
+    raising a ValidationError for the parameter otherwise"""
+    try:
+        ids = [int(str_id) for str_id in qs.split(',')]
+    except ValueError:
+        ids = None
+    if ids is None or not all(0 <= pk < 2 ** 31 for pk in ids):
+        raise ValidationError({param: ['A comma separated list of ids is '
+                                       'required.']})
+
+    return ids
+
+
+def range_filters(query_params):
+    """Return the lookups of the range filters among the query parameters,
+    raising a ValidationError for values that are not numbers"""
+    lookups, errors = {}, {}
+    for param, (lookup, field) in RANGE_FILTERS.items():
+        value = query_params.get(param)
+        if value is None:
+            continue
+        try:
+            lookups[lookup] = field.run_validation(value)
+        except ValidationError as error:
+            errors[param] = error.detail
+    if errors:
+        raise ValidationError(errors)
+
+    return lookups
+
+
+def requested_facets(query_params):
+    """Return the facets asked for with the facets parameter, raising a
+    ValidationError for unknown ones"""
+    facets = [facet for facet in query_params.get('facets', '').split(',')
+              if facet]
+    unknown = [facet for facet in facets if facet not in FACETS]
+    if unknown:
+        raise ValidationError(
+            {'facets': [f'Unknown facet {facet!r}.' for facet in unknown]}
+        )
+
+    return list(dict.fromkeys(facets))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class ShoppingListView(views.APIView):
+    """Merge the ingredients of several recipes into a shopping list"""
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        recipes = request.query_params.get('recipes')
+        if not recipes:
+            return Response({'recipes': ['Select at least one recipe.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(shopping_list(request.user,
+                                      params_to_ids(recipes, 'recipes')))
+
+
+class RecipeViewSet(ConditionalUpdateMixin, viewsets.ModelViewSet):
     """Manage Recipes in the DB"""
     serializer_class = serializers.RecipeSerializer
+    read_serializer = ReadSerializer(serializers.RecipeSerializer)
     queryset = Recipe.objects.all()
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-
-    def _params_to_ids(self, qs):
-        """Convert a list of string ids into list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    throttle_scopes = {'upload_image': 'upload'}
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ids(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+        index = postings.get_index(self.request.user.pk) \
+            if tags or ingredients else None
+        if index is not None:
+            recipe_ids = index.recipes_with(
+                params_to_ids(tags, 'tags') if tags else None,
+                params_to_ids(ingredients, 'ingredients') if ingredients
+                else None
+            )
+            # One array literal rather than a parameter per id, it is
+            # parsed much faster for thousands of ids
+            queryset = queryset.filter(id__in=RawSQL(
+                'SELECT unnest(%s::integer[])',
+                ('{' + ','.join(map(str, recipe_ids.tolist())) + '}',)
+            ))
+        else:
+            if tags:
+                tag_ids = params_to_ids(tags, 'tags')
+                queryset = queryset.filter(tags__id__in=tag_ids)
 
-        if ingredients:
-            ingredient_ids = self._params_to_ids(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            if ingredients:
+                ingredient_ids = params_to_ids(ingredients, 'ingredients')
+                queryset = queryset.filter(
+                    ingredients__id__in=ingredient_ids
+                )
 
-        return queryset.filter(user=self.request.user)
+        return keyset.order(
+            queryset.filter(user=self.request.user,
+                            **range_filters(self.request.query_params)),
+            *keyset.ordering(self.request.query_params)
+        )
 
     def get_serializer_class(self):
         """Retrieve appropriate serializer class"""
@@ -74,6 +188,176 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        """List recipes through the precompiled read serializer, or as JSON
+        built by the database.
+
+        With a limit the list is paged by keyset, and with facets their
+        counts over all filtered recipes are added, both turning the list
+        into an object with the recipes as results.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = requested_facets(request.query_params)
+        limit = keyset.page_size(request.query_params)
+        extra = {}
+        if facets:
+            extra['facets'] = facet_counts(queryset, facets)
+        if limit is not None:
+            queryset, extra['next'] = self._page(queryset, limit)
+
+        if settings.RECIPE_JSON_IN_DATABASE:
+            content = sql_json.stream_list(queryset)
+            if extra:
+                # The other keys follow the results in the same object
+                content = itertools.chain(('{"results":',), content,
+                                          (',' + json.dumps(extra)[1:],))
+            return StreamingHttpResponse(content,
+                                         content_type='application/json')
+
+        recipes = self.read_serializer.data(queryset)
+        if extra:
+            return Response({'results': recipes, **extra})
+        return Response(recipes)
+
+    def _page(self, queryset, limit):
+        """Return the recipes of the page asked for and the URL of the next
+        page, or None for the last one"""
+        field, descending = keyset.ordering(self.request.query_params)
+        ordering_value = f'{"-" if descending else ""}{field}'
+        cursor = self.request.query_params.get('cursor')
+        key = keyset.decode_cursor(cursor, ordering_value) if cursor else None
+
+        keys = keyset.page_keys(queryset, field, descending, limit, key)
+        next_url = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_url = replace_query_param(
+                self.request.build_absolute_uri(), 'cursor',
+                keyset.encode_cursor(ordering_value, keys[-1])
+            )
+        page = keyset.order(
+            Recipe.objects.filter(id__in=[pk for _, pk in keys]),
+            field, descending
+        )
+        return page, next_url
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, as JSON built by the database if enabled"""
+        if not settings.RECIPE_JSON_IN_DATABASE:
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            row = sql_json.detail(queryset, kwargs[self.lookup_field])
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise Http404
+
+        content, version = row
+        self.headers['ETag'] = etag(version)
+        return HttpResponse(content, content_type='application/json')
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the recipes of the user as NDJSON or CSV"""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'export_format': [f'Unsupported format {export_format}']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        iter_rows, content_type = EXPORT_FORMATS[export_format]
+        resp = StreamingHttpResponse(iter_rows(self.get_queryset()),
+                                     content_type=content_type)
+        resp['Content-Disposition'] = \
+            f'attachment; filename="recipes.{export_format}"'
+        return resp
+
+    @action(methods=['GET'], detail=False)
+    def totals(self, request):
+        """Sum prices and ingredient quantities of the selected recipes"""
+        queryset = self.get_queryset()
+        recipes = request.query_params.get('recipes')
+        if recipes:
+            queryset = queryset.filter(
+                id__in=params_to_ids(recipes, 'recipes')
+            )
+
+        return Response(recipe_totals(queryset))
+
+    @action(methods=['POST'], detail=False, url_path='import',
+            url_name='import')
+    def import_recipes(self, request):
+        """Bulk import an uploaded NDJSON or CSV recipe library"""
+        upload = request.FILES.get('file')
+        import_format = request.data.get('import_format', 'ndjson')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if import_format not in IMPORT_FORMATS:
+            return Response(
+                {'import_format': [f'Unsupported format {import_format}']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = import_recipes(request.user,
+                                codecs.iterdecode(upload, 'utf-8'),
+                                import_format)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the recipes of the user sharing the most tags and
+        ingredients with a recipe, with their similarity"""
+        metric = request.query_params.get('metric', 'jaccard')
+        if metric not in similarity.SIMILARITY_METRICS:
+            return Response(
+                {'metric': [f'Unsupported metric {metric!r}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response({'limit': ['A number from 1 to 100 is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        recipe = get_object_or_404(self.get_queryset(), pk=pk)
+        scores = dict(similarity.similar_recipes(request.user.pk, recipe.pk,
+                                                 limit, metric))
+        ranks = {pk: rank for rank, pk in enumerate(scores)}
+        recipes = self.read_serializer.data(
+            self.get_queryset().filter(pk__in=scores)
+        )
+        for row in recipes:
+            row['similarity'] = round(scores[row['id']], 4)
+        return Response(sorted(recipes, key=lambda row: ranks[row['id']]))
+
+    @action(methods=['GET'], detail=True, url_path='same-photo',
+            url_name='same-photo')
+    def same_photo(self, request, pk=None):
+        """List the other recipes of the user with the same photo, even
+        re-encoded or resized, closest first"""
+        # Not get_object(), the ETag of the recipe is not the one of the list
+        recipe = get_object_or_404(self.get_queryset(), pk=pk)
+        if recipe.image_hash is None:
+            return Response([])
+
+        ranks = {
+            duplicate.pk: rank
+            for rank, duplicate in enumerate(images.near_duplicates(
+                self.get_queryset(), recipe.image_hash
+            ))
+            if duplicate.pk != recipe.pk
+        }
+        recipes = self.read_serializer.data(
+            self.get_queryset().filter(pk__in=ranks)
+        )
+        return Response(sorted(recipes, key=lambda row: ranks[row['id']]))
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -5,6 +5,9 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import Job
+from core.tasks import purge_account
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -126,3 +129,14 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_delete_account(self):
+        """Test deleting the account locks the user out at once and
+        purges their data in the background"""
+        resp = self.client.delete(ME_URL)
+
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(Job.objects.filter(task=purge_account.task_name,
+                                           payload__user_id=self.user.id))